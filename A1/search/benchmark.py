@@ -0,0 +1,294 @@
+# benchmark.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Headless benchmark of the search algorithms in search.py on the problems in
+searchAgents.py, over the layouts in the layouts directory.
+
+Every combination of algorithm, problem type, heuristic and layout is run
+without graphics in a fresh worker process, a number of times, and the
+expansions, wall time, peak memory and path cost are reported in a table and
+written to a JSON file.  Passing a previous JSON file with --baseline flags
+every case that got slower, expanded more nodes or found a longer path.
+
+  python benchmark.py -a bfs,astar -l mediumMaze,bigMaze -o before.json
+  python benchmark.py -a bfs,astar -l mediumMaze,bigMaze --baseline before.json
+  python benchmark.py -a wastar,focal -l bigMaze --weight 3 --epsilon 0.2
+"""
+
+import json
+import math
+import optparse
+import os
+import resource
+import sys
+import time
+
+import layout
+import pacman
+import parallelSearch
+import search
+import searchAgents
+import util
+
+# The heuristics that apply to each problem type; nullHeuristic is used for
+# every uninformed algorithm
+PROBLEM_HEURISTICS = {
+    'PositionSearchProblem': ['nullHeuristic', 'manhattanHeuristic', 'euclideanHeuristic'],
+    'CornersProblem': ['nullHeuristic', 'cornersHeuristic', 'cornersTSPHeuristic'],
+    'FoodSearchProblem': ['nullHeuristic', 'foodHeuristic', 'foodMSTHeuristic'],
+    'BitmaskFoodSearchProblem': ['nullHeuristic', 'foodHeuristic', 'foodMSTHeuristic'],
+}
+
+INFORMED_ALGORITHMS = ['astar', 'wastar', 'focal', 'idastar', 'jps']
+
+# The command line option passed on to each algorithm that takes one
+ALGORITHM_OPTIONS = {'wastar': 'weight', 'focal': 'epsilon'}
+
+# Algorithms that need a problem with a single goal state (getGoalState)
+SINGLE_GOAL_ALGORITHMS = ['bds', 'jps']
+
+
+def problemsForLayout(layoutName):
+    """
+    Returns the problem types that make sense on a layout: position search
+    everywhere, the corners problem on corners layouts and the food problems
+    on food search layouts.
+    """
+    problems = ['PositionSearchProblem']
+    if 'Corners' in layoutName:
+        problems.append('CornersProblem')
+    if 'Search' in layoutName:
+        problems += ['FoodSearchProblem', 'BitmaskFoodSearchProblem']
+    return problems
+
+
+def makeProblem(problemName, gameState):
+    if problemName == 'PositionSearchProblem':
+        return searchAgents.PositionSearchProblem(gameState, warn=False, visualize=False)
+    return getattr(searchAgents, problemName)(gameState)
+
+
+def getHeuristic(name):
+    if hasattr(searchAgents, name):
+        return getattr(searchAgents, name)
+    return getattr(search, name)
+
+
+def listCases(options):
+    """Returns the (algorithm, problem, heuristic, layout) tuples to run."""
+    cases = []
+    for layoutName in options.layouts:
+        for problemName in problemsForLayout(layoutName):
+            if options.problems and problemName not in options.problems:
+                continue
+            for algorithm in options.algorithms:
+                if algorithm in SINGLE_GOAL_ALGORITHMS and problemName != 'PositionSearchProblem':
+                    continue
+                if algorithm in INFORMED_ALGORITHMS:
+                    heuristics = PROBLEM_HEURISTICS[problemName]
+                else:
+                    heuristics = ['nullHeuristic']
+                for heuristic in heuristics:
+                    if options.heuristics and heuristic not in options.heuristics:
+                        continue
+                    cases.append((algorithm, problemName, heuristic, layoutName))
+    return cases
+
+
+def searchArguments(algorithm, options):
+    """
+    Returns the keyword arguments other than the heuristic to call algorithm
+    with, e.g. {'weight': 2.0} for wastar.
+    """
+    if algorithm in ALGORITHM_OPTIONS:
+        name = ALGORITHM_OPTIONS[algorithm]
+        return {name: getattr(options, name)}
+    return {}
+
+
+def runCase(case, searchKwargs, connection):
+    """
+    Runs one case in a worker process and sends back a dict of measurements.
+    Peak memory is the growth of the worker's maximum resident set size while
+    building the problem and searching, in kilobytes.
+    """
+    algorithm, problemName, heuristicName, layoutName = case
+    try:
+        util.mutePrint()
+        startMemory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        gameState = pacman.GameState()
+        gameState.initialize(layout.getLayout(layoutName), 0)
+        problem = makeProblem(problemName, gameState)
+
+        stats = search.SearchStats()
+        if algorithm in INFORMED_ALGORITHMS:
+            searchKwargs = dict(searchKwargs, heuristic=getHeuristic(heuristicName))
+        actions = stats.run(getattr(search, algorithm), problem, **searchKwargs)
+        util.unmutePrint()
+
+        result = stats.asDict()
+        result['pathLength'] = len(actions)
+        result['pathCost'] = problem.getCostOfActions(actions) if actions else None
+        result['peakMemoryKB'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - startMemory
+        result['status'] = 'ok'
+    except Exception, e:
+        util.unmutePrint()
+        result = {'status': 'error: %s' % e}
+    connection.send(result)
+    connection.close()
+
+
+def runInWorker(case, searchKwargs, timeout):
+    """Runs case in a fresh process, giving up after timeout seconds."""
+    worker, connection = parallelSearch.startWorker(runCase, (case, searchKwargs))
+    if connection.poll(timeout):
+        result = parallelSearch.receiveResult(worker, connection)
+        if result is None:
+            result = {'status': 'error: worker exited with code %s' % worker.exitcode}
+    else:
+        result = {'status': 'timeout'}
+    parallelSearch.stopWorker(worker, connection)
+    return result
+
+
+def benchmarkCase(case, searchKwargs, repeat, timeout):
+    """
+    Runs case repeat times and returns a record with the measurements of the
+    first run and the mean, standard deviation and minimum of the times.
+    """
+    algorithm, problemName, heuristic, layoutName = case
+    record = {'algorithm': algorithm, 'problem': problemName, 'heuristic': heuristic, 'layout': layoutName,
+              'searchArguments': searchKwargs}
+    times = []
+    for i in range(repeat):
+        result = runInWorker(case, searchKwargs, timeout)
+        if result['status'] != 'ok':
+            record['status'] = result['status']
+            return record
+        if not times:
+            record.update(result)
+        else:
+            record['peakMemoryKB'] = max(record['peakMemoryKB'], result['peakMemoryKB'])
+        times.append(result['totalTime'])
+    mean = sum(times) / len(times)
+    record['totalTime'] = mean
+    record['timeStdev'] = math.sqrt(sum((t - mean) ** 2 for t in times) / len(times))
+    record['timeMin'] = min(times)
+    record['runs'] = repeat
+    return record
+
+
+def caseKey(record):
+    return record['algorithm'], record['problem'], record['heuristic'], record['layout']
+
+
+def compareToBaseline(records, baseline, tolerance, minDelta):
+    """
+    Returns a list of (record, reason) pairs for the cases that got worse
+    than in baseline: slower by more than the tolerance (and by more than
+    minDelta seconds, to ignore timer noise), more expansions, a more
+    expensive path or a failure.  Cases run with other search arguments
+    (--weight, --epsilon) than in baseline are not compared.
+    """
+    previous = dict((caseKey(record), record) for record in baseline)
+    regressions = []
+    for record in records:
+        old = previous.get(caseKey(record))
+        if old is None or old['status'] != 'ok' or old.get('searchArguments', {}) != record['searchArguments']:
+            continue
+        if record['status'] != 'ok':
+            regressions.append((record, record['status']))
+            continue
+        if (record['totalTime'] > old['totalTime'] * (1 + tolerance) and
+                record['totalTime'] - old['totalTime'] > minDelta):
+            regressions.append((record, 'time %.3fs -> %.3fs' % (old['totalTime'], record['totalTime'])))
+        if record['nodesExpanded'] > old['nodesExpanded']:
+            regressions.append((record, 'expanded %d -> %d' % (old['nodesExpanded'], record['nodesExpanded'])))
+        if old['pathCost'] is not None and (record['pathCost'] is None or
+                                            record['pathCost'] > old['pathCost'] + 1e-9):
+            regressions.append((record, 'path cost %s -> %s' % (old['pathCost'], record['pathCost'])))
+    return regressions
+
+
+def formatRecord(record):
+    name = '%-8s %-25s %-19s %-18s' % caseKey(record)
+    if record['status'] != 'ok':
+        return '%s %s' % (name, record['status'])
+    return '%s %9d %9.4f %8.4f %9d %8s' % (name, record['nodesExpanded'], record['totalTime'],
+                                           record['timeStdev'], record['peakMemoryKB'], record['pathCost'])
+
+
+def readCommand(argv):
+    parser = optparse.OptionParser(usage='python benchmark.py [options]', description=__doc__.split('\n\n')[0])
+    allLayouts = sorted(name[:-len('.lay')] for name in os.listdir('layouts') if name.endswith('.lay'))
+    parser.add_option('-a', '--algorithms', default='bfs,ucs,astar',
+                      help='comma separated search functions from search.py [Default: %default]')
+    parser.add_option('-p', '--problems', default='',
+                      help='comma separated problem types to run [Default: all that fit the layout]')
+    parser.add_option('-H', '--heuristics', default='',
+                      help='comma separated heuristics to run [Default: all that fit the problem]')
+    parser.add_option('-l', '--layouts', default=','.join(allLayouts),
+                      help='comma separated layouts to run [Default: every layout in layouts/]')
+    parser.add_option('-r', '--repeat', type='int', default=3,
+                      help='number of runs of every case [Default: %default]')
+    parser.add_option('-t', '--timeout', type='float', default=30,
+                      help='seconds after which a run is abandoned [Default: %default]')
+    parser.add_option('-o', '--output', default='benchmark.json',
+                      help='file to write the results to as JSON [Default: %default]')
+    parser.add_option('-b', '--baseline', default=None,
+                      help='JSON results of an earlier run to compare against')
+    parser.add_option('--tolerance', type='float', default=0.2,
+                      help='relative slowdown flagged as a regression [Default: %default]')
+    parser.add_option('--min-delta', dest='minDelta', type='float', default=0.01,
+                      help='smallest slowdown in seconds flagged as a regression [Default: %default]')
+    parser.add_option('--weight', type='float', default=2,
+                      help='weight on the heuristic for wastar [Default: %default]')
+    parser.add_option('--epsilon', type='float', default=0.5,
+                      help='suboptimality bound for focal [Default: %default]')
+    options, args = parser.parse_args(argv)
+    if args:
+        raise Exception('Command line input not understood: ' + str(args))
+    for listOption in ['algorithms', 'problems', 'heuristics', 'layouts']:
+        setattr(options, listOption, [name for name in getattr(options, listOption).split(',') if name])
+    return options
+
+
+def runBenchmark(options):
+    records = []
+    print('%-8s %-25s %-19s %-18s %9s %9s %8s %9s %8s' % ('algo', 'problem', 'heuristic', 'layout',
+                                                         'expanded', 'time', 'stdev', 'memKB', 'cost'))
+    for case in listCases(options):
+        record = benchmarkCase(case, searchArguments(case[0], options), options.repeat, options.timeout)
+        print(formatRecord(record))
+        records.append(record)
+
+    with open(options.output, 'w') as f:
+        json.dump(records, f, indent=2, sort_keys=True)
+    print('Results written to %s' % options.output)
+
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+        regressions = compareToBaseline(records, baseline, options.tolerance, options.minDelta)
+        for record, reason in regressions:
+            print('REGRESSION: %s %s %s %s: %s' % (caseKey(record) + (reason,)))
+        if regressions:
+            return 1
+        print('No regressions against %s' % options.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(runBenchmark(readCommand(sys.argv[1:])))
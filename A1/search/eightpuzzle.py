@@ -14,10 +14,20 @@
 
 import search
 import random
+import math
+import os
+from array import array
+from collections import deque
 
 # Module Classes
 
-class EightPuzzleState:
+# The code of the solved puzzle: number i in cell i
+GOAL_CODE = sum([i << 4 * i for i in range(9)])
+
+# How far the blank moves through the cells for each move
+MOVE_OFFSETS = {'up': -3, 'down': 3, 'left': -1, 'right': 1}
+
+class EightPuzzleState(object):
     """
     The Eight Puzzle is described in the course textbook on
     page 64.
@@ -26,6 +36,7 @@ class EightPuzzleState:
     task of recasting this puzzle as a search problem is left to
     the EightPuzzleSearchProblem class.
     """
+    __slots__ = ('code', 'blank')
 
     def __init__( self, numbers ):
         """
@@ -46,18 +57,37 @@ class EightPuzzleState:
             | 6 | 7 | 8 |
             ------------
 
-        The configuration of the puzzle is stored in a 2-dimensional
-        list (a list of lists) 'cells'.
+        The configuration of the puzzle is stored in the int 'code',
+        which holds the number in cell i (counting the cells in
+        row-major order) in bits 4i to 4i+3, and the cell of the
+        blank is kept in 'blank'.
+        """
+        self.code = 0
+        for i, number in enumerate(numbers):
+            self.code |= number << 4 * i
+        self.blank = list(numbers).index(0)
+
+    def fromCode(code):
+        """
+          Returns the puzzle with the given code.
         """
-        self.cells = []
-        numbers = numbers[:] # Make a copy so as not to cause side-effects.
-        numbers.reverse()
-        for row in range( 3 ):
-            self.cells.append( [] )
-            for col in range( 3 ):
-                self.cells[row].append( numbers.pop() )
-                if self.cells[row][col] == 0:
-                    self.blankLocation = row, col
+        puzzle = EightPuzzleState.__new__(EightPuzzleState)
+        puzzle.code = code
+        for i in range(9):
+            if (code >> 4 * i) & 15 == 0:
+                puzzle.blank = i
+        return puzzle
+    fromCode = staticmethod(fromCode)
+
+    def getCells(self):
+        "The puzzle as a list of rows, each a list of numbers."
+        return [[(self.code >> 4 * (3 * row + col)) & 15 for col in range( 3 )] for row in range( 3 )]
+    cells = property(getCells)
+
+    def getBlankLocation(self):
+        "The (row, col) of the blank space."
+        return divmod(self.blank, 3)
+    blankLocation = property(getBlankLocation)
 
     def isGoal( self ):
         """
@@ -77,13 +107,7 @@ class EightPuzzleState:
         >>> EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).isGoal()
         False
         """
-        current = 0
-        for row in range( 3 ):
-            for col in range( 3 ):
-                if current != self.cells[row][col]:
-                    return False
-                current += 1
-        return True
+        return self.code == GOAL_CODE
 
     def legalMoves( self ):
         """
@@ -96,7 +120,7 @@ class EightPuzzleState:
         ['down', 'right']
         """
         moves = []
-        row, col = self.blankLocation
+        row, col = divmod(self.blank, 3)
         if(row != 0):
             moves.append('up')
         if(row != 2):
@@ -113,36 +137,23 @@ class EightPuzzleState:
         updated based on the provided move.
 
         The move should be a string drawn from a list returned by legalMoves.
-        Illegal moves will raise an exception, which may be an array bounds
-        exception.
+        Illegal moves will raise an exception.
 
         NOTE: This function *does not* change the current object.  Instead,
         it returns a new object.
         """
-        row, col = self.blankLocation
-        if(move == 'up'):
-            newrow = row - 1
-            newcol = col
-        elif(move == 'down'):
-            newrow = row + 1
-            newcol = col
-        elif(move == 'left'):
-            newrow = row
-            newcol = col - 1
-        elif(move == 'right'):
-            newrow = row
-            newcol = col + 1
-        else:
-            raise "Illegal Move"
-
-        # Create a copy of the current eightPuzzle
-        newPuzzle = EightPuzzleState([0, 0, 0, 0, 0, 0, 0, 0, 0])
-        newPuzzle.cells = [values[:] for values in self.cells]
-        # And update it to reflect the move
-        newPuzzle.cells[row][col] = self.cells[newrow][newcol]
-        newPuzzle.cells[newrow][newcol] = self.cells[row][col]
-        newPuzzle.blankLocation = newrow, newcol
-
+        if move not in MOVE_OFFSETS:
+            raise Exception("Illegal Move")
+        newBlank = self.blank + MOVE_OFFSETS[move]
+        if not 0 <= newBlank < 9 or (move in ('left', 'right') and newBlank // 3 != self.blank // 3):
+            raise Exception("Illegal Move")
+
+        # The blank's nibble is 0, so moving the tile is one subtraction
+        # and one addition on the code
+        tile = (self.code >> 4 * newBlank) & 15
+        newPuzzle = EightPuzzleState.__new__(EightPuzzleState)
+        newPuzzle.code = self.code - (tile << 4 * newBlank) + (tile << 4 * self.blank)
+        newPuzzle.blank = newBlank
         return newPuzzle
 
     # Utilities for comparison and display
@@ -155,13 +166,23 @@ class EightPuzzleState:
               EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).result('left')
           True
         """
-        for row in range( 3 ):
-            if self.cells[row] != other.cells[row]:
-                return False
-        return True
+        return isinstance(other, EightPuzzleState) and self.code == other.code
+
+    def __ne__(self, other):
+        return not self == other
 
     def __hash__(self):
-        return hash(str(self.cells))
+        return hash(self.code)
+
+    def getNumbers(self):
+        """
+          Returns the numbers in the cells in row-major order, in the format
+        taken by the constructor.
+
+        >>> EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).getNumbers()
+        (1, 0, 2, 3, 4, 5, 6, 7, 8)
+        """
+        return tuple([(self.code >> 4 * i) & 15 for i in range(9)])
 
     def __getAsciiString(self):
         """
@@ -196,7 +217,7 @@ class EightPuzzleSearchProblem(search.SearchProblem):
         self.puzzle = puzzle
 
     def getStartState(self):
-        return puzzle
+        return self.puzzle
 
     def isGoalState(self,state):
         return state.isGoal()
@@ -221,6 +242,202 @@ class EightPuzzleSearchProblem(search.SearchProblem):
         """
         return len(actions)
 
+    def packState(self, state):
+        """
+          Returns the puzzle as an int holding the number in each cell, in
+        row-major order, in 4 bits.
+        """
+        return state.code
+
+    def unpackState(self, code):
+        return EightPuzzleState.fromCode(code)
+
+# Heuristics
+#
+# These work on the numbers of a size x size sliding puzzle in row-major
+# order, with the blank as 0 and the goal having number i in cell i, so the
+# same code serves the eight puzzle and the fifteen puzzle.
+
+def puzzleNeighbours(size):
+    """
+      Returns, for every cell of a size x size puzzle, the cells next to it.
+    """
+    neighbours = []
+    for cell in range(size * size):
+        row, col = divmod(cell, size)
+        cells = []
+        if row != 0:
+            cells.append(cell - size)
+        if row != size - 1:
+            cells.append(cell + size)
+        if col != 0:
+            cells.append(cell - 1)
+        if col != size - 1:
+            cells.append(cell + 1)
+        neighbours.append(cells)
+    return neighbours
+
+def longestIncreasingLength(values):
+    "Returns the length of the longest increasing subsequence of values."
+    lengths = []
+    for i in range(len(values)):
+        lengths.append(1 + max([lengths[j] for j in range(i) if values[j] < values[i]] or [0]))
+    return max(lengths or [0])
+
+def linearConflictDistance(numbers, size):
+    """
+      Returns the Manhattan distance of the tiles to their goal cells plus two
+    moves for every tile that has to leave its row or column to let another
+    tile of the same line past.  The tiles that have to leave a line are the
+    ones outside the longest run of tiles already in goal order, so the
+    estimate stays admissible when three or more tiles are in conflict.
+    """
+    distance = 0
+    rows = [[] for i in range(size)]
+    cols = [[] for i in range(size)]
+    for cell, tile in enumerate(numbers):
+        if tile == 0:
+            continue
+        row, col = divmod(cell, size)
+        goalRow, goalCol = divmod(tile, size)
+        distance += abs(row - goalRow) + abs(col - goalCol)
+        # Cells are visited in row-major order, so each line lists its tiles
+        # in the order they appear along it
+        if row == goalRow:
+            rows[row].append(goalCol)
+        if col == goalCol:
+            cols[col].append(goalRow)
+    for line in rows + cols:
+        distance += 2 * (len(line) - longestIncreasingLength(line))
+    return distance
+
+def linearConflictHeuristic(state, problem=None):
+    "Manhattan distance plus linear conflicts for an EightPuzzleState."
+    return linearConflictDistance(state.getNumbers(), 3)
+
+class PatternDatabase:
+    """
+      A pattern database for a subset of the tiles of a size x size puzzle.
+
+    For every placement of the pattern tiles it holds the fewest moves of
+    pattern tiles that bring them to their goal cells, with the other tiles
+    free to be anywhere.  Since moves of other tiles are not counted, the
+    values of databases over disjoint patterns can be added up.
+
+    The table is built by a breadth first search backwards from the goal over
+    the placements of the pattern tiles and the blank, and holds one byte per
+    placement, indexed by the cells of the pattern tiles as digits in base
+    size * size.  It is saved in directory and read from there afterwards.
+    """
+    UNSEEN = 255
+
+    def __init__(self, size, pattern, directory=None):
+        self.size = size
+        self.pattern = tuple(pattern)
+        self.numCells = size * size
+        self.weights = [self.numCells ** (len(self.pattern) - 1 - i) for i in range(len(self.pattern))]
+        self.tableSize = self.numCells ** len(self.pattern)
+
+        if directory is None:
+            directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'patterndb')
+        fileName = os.path.join(directory, 'pdb-%d-%s.bin' % (size, '-'.join([str(tile) for tile in self.pattern])))
+        if os.path.exists(fileName):
+            self.table = array('B')
+            f = open(fileName, 'rb')
+            try:
+                self.table.fromfile(f, self.tableSize)
+            finally:
+                f.close()
+        else:
+            self.table = self.build()
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            # Write to a temporary file first so an interrupted build never
+            # leaves a truncated table behind
+            f = open(fileName + '.tmp', 'wb')
+            try:
+                self.table.tofile(f)
+            finally:
+                f.close()
+            os.rename(fileName + '.tmp', fileName)
+
+    def build(self):
+        # 0-1 breadth first search over (blank, pattern placement) codes:
+        # sliding a pattern tile into the blank costs a move, sliding any
+        # other tile is free
+        UNSEEN = self.UNSEEN
+        tableSize = self.tableSize
+        weights = self.weights
+        neighbours = puzzleNeighbours(self.size)
+        distances = array('B', [UNSEEN]) * (self.numCells * tableSize)
+        table = array('B', [UNSEEN]) * tableSize
+
+        start = sum([tile * weight for tile, weight in zip(self.pattern, weights)])   # blank in cell 0
+        distances[start] = 0
+        Open = deque([start])
+        while Open:
+            code = Open.popleft()
+            distance = distances[code]
+            blank, index = divmod(code, tableSize)
+            if distance < table[index]:
+                table[index] = distance
+
+            occupant = {}
+            rest = index
+            for weight in weights:
+                cell, rest = divmod(rest, weight)
+                occupant[cell] = weight
+            for cell in neighbours[blank]:
+                weight = occupant.get(cell)
+                if weight is None:
+                    Succ = cell * tableSize + index
+                    if distance < distances[Succ]:
+                        distances[Succ] = distance
+                        Open.appendleft(Succ)
+                else:
+                    Succ = cell * tableSize + index + (blank - cell) * weight
+                    if distance + 1 < distances[Succ]:
+                        distances[Succ] = distance + 1
+                        Open.append(Succ)
+        return table
+
+    def getDistance(self, cellOf):
+        """
+          cellOf: a sequence giving the cell of every tile
+
+        Returns the moves of pattern tiles needed to bring them home.
+        """
+        index = 0
+        for tile, weight in zip(self.pattern, self.weights):
+            index += cellOf[tile] * weight
+        return self.table[index]
+
+# Disjoint patterns that cover every tile, for each puzzle size
+PATTERNS = {3: [(1, 2, 3, 4), (5, 6, 7, 8)],
+            4: [(1, 2, 3, 4, 5), (6, 7, 8, 9, 10), (11, 12, 13, 14, 15)]}
+
+PATTERN_DATABASE_CACHE = {}
+
+def getPatternDatabases(size):
+    if size not in PATTERN_DATABASE_CACHE:
+        PATTERN_DATABASE_CACHE[size] = [PatternDatabase(size, pattern) for pattern in PATTERNS[size]]
+    return PATTERN_DATABASE_CACHE[size]
+
+def patternDatabaseDistance(numbers, size):
+    """
+      Returns the sum of the disjoint pattern database values for the puzzle
+    with the given numbers in row-major order.
+    """
+    cellOf = [0] * len(numbers)
+    for cell, tile in enumerate(numbers):
+        cellOf[tile] = cell
+    return sum([database.getDistance(cellOf) for database in getPatternDatabases(size)])
+
+def patternDatabaseHeuristic(state, problem=None):
+    "Additive pattern database heuristic for an EightPuzzleState."
+    numbers = state.getNumbers()
+    return patternDatabaseDistance(numbers, int(round(math.sqrt(len(numbers)))))
+
 EIGHT_PUZZLE_DATA = [[1, 0, 2, 3, 4, 5, 6, 7, 8],
                      [1, 7, 8, 2, 3, 4, 5, 6, 0],
                      [4, 3, 2, 7, 0, 5, 1, 6, 8],
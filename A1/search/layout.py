@@ -14,26 +14,50 @@
 
 from util import manhattanDistance
 from game import Grid
+from game import Directions
+from array import array
+import hashlib
 import os
 import random
+import struct
 
+# Ray lengths by layout digest (see Layout.initializeVisibilityMatrix)
 VISIBILITY_MATRIX_CACHE = {}
 
+# The half-cell step looked along in each direction, pairing the vectors with
+# the directions in the same way the original visibility code did
+VISIBILITY_STEPS = {Directions.NORTH: (-0.5, 0), Directions.SOUTH: (0.5, 0),
+                    Directions.WEST: (0, -0.5), Directions.EAST: (0, 0.5)}
+
+# Parsed layouts by resolved file path, as (modification time, Layout)
+LAYOUT_CACHE = {}
+
 class Layout:
     """
     A Layout manages the static information about the game board.
     """
 
-    def __init__(self, layoutText):
+    def __init__(self, layoutText, parsed=None):
+        """
+        parsed, when given, is the (walls, food, capsules, agentPositions,
+        numGhosts) of layoutText as produced by processLayoutText, which is
+        then skipped; loadCompiledLayout uses it.
+        """
         self.width = len(layoutText[0])
         self.height= len(layoutText)
-        self.walls = Grid(self.width, self.height, False)
-        self.food = Grid(self.width, self.height, False)
-        self.capsules = []
-        self.agentPositions = []
-        self.numGhosts = 0
-        self.processLayoutText(layoutText)
+        if parsed is None:
+            self.walls = Grid(self.width, self.height, False)
+            self.food = Grid(self.width, self.height, False)
+            self.capsules = []
+            self.agentPositions = []
+            self.numGhosts = 0
+            self.processLayoutText(layoutText)
+        else:
+            self.walls, self.food, self.capsules, self.agentPositions, self.numGhosts = parsed
         self.layoutText = layoutText
+        self.digest = hashlib.sha1('\n'.join(layoutText)).hexdigest()
+        # Identifies the walls to searchAgents.wallsKey without a scan of the grid
+        self.walls.layoutKey = self.digest
         self.totalFood = len(self.food.asList())
         # self.initializeVisibilityMatrix()
 
@@ -41,25 +65,38 @@ class Layout:
         return self.numGhosts
 
     def initializeVisibilityMatrix(self):
+        """
+        Computes, for every open cell and direction, how many half-cell steps
+        can be taken from the cell's centre along the direction before
+        landing on a wall: rayLengths[direction][x * height + y].  A ghost is
+        visible in that direction if it sits on one of those steps.
+
+        Each direction takes one sweep over the grid, visiting the cell
+        towards the wall first, since a cell sees two steps further than its
+        neighbour in the direction looked.  Results are shared by all layouts
+        with the same text, keyed by the digest taken when parsing.
+        """
         global VISIBILITY_MATRIX_CACHE
-        if reduce(str.__add__, self.layoutText) not in VISIBILITY_MATRIX_CACHE:
-            from game import Directions
-            vecs = [(-0.5,0), (0.5,0),(0,-0.5),(0,0.5)]
-            dirs = [Directions.NORTH, Directions.SOUTH, Directions.WEST, Directions.EAST]
-            vis = Grid(self.width, self.height, {Directions.NORTH:set(), Directions.SOUTH:set(), Directions.EAST:set(), Directions.WEST:set(), Directions.STOP:set()})
-            for x in range(self.width):
-                for y in range(self.height):
-                    if self.walls[x][y] == False:
-                        for vec, direction in zip(vecs, dirs):
-                            dx, dy = vec
-                            nextx, nexty = x + dx, y + dy
-                            while (nextx + nexty) != int(nextx) + int(nexty) or not self.walls[int(nextx)][int(nexty)] :
-                                vis[x][y][direction].add((nextx, nexty))
-                                nextx, nexty = x + dx, y + dy
-            self.visibility = vis
-            VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)] = vis
-        else:
-            self.visibility = VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)]
+        if self.digest not in VISIBILITY_MATRIX_CACHE:
+            width, height = self.width, self.height
+            rayLengths = {Directions.STOP: array('H', [0]) * (width * height)}
+            for direction, (dx, dy) in VISIBILITY_STEPS.items():
+                stepx, stepy = int(dx * 2), int(dy * 2)
+                lengths = array('H', [0]) * (width * height)
+                xs = range(width) if stepx <= 0 else range(width - 1, -1, -1)
+                ys = range(height) if stepy <= 0 else range(height - 1, -1, -1)
+                for x in xs:
+                    for y in ys:
+                        if self.walls[x][y]:
+                            continue
+                        nextx, nexty = x + stepx, y + stepy
+                        if not (0 <= nextx < width and 0 <= nexty < height) or self.walls[nextx][nexty]:
+                            lengths[x * height + y] = 1
+                        else:
+                            lengths[x * height + y] = lengths[nextx * height + nexty] + 2
+                rayLengths[direction] = lengths
+            VISIBILITY_MATRIX_CACHE[self.digest] = rayLengths
+        self.rayLengths = VISIBILITY_MATRIX_CACHE[self.digest]
 
     def isWall(self, pos):
         x, col = pos
@@ -84,7 +121,16 @@ class Layout:
 
     def isVisibleFrom(self, ghostPos, pacPos, pacDirection):
         row, col = [int(x) for x in pacPos]
-        return ghostPos in self.visibility[row][col][pacDirection]
+        if pacDirection not in VISIBILITY_STEPS:
+            return False
+        dx, dy = VISIBILITY_STEPS[pacDirection]
+        offsetx, offsety = ghostPos[0] - row, ghostPos[1] - col
+        # The ghost has to be a whole number of half steps along the ray
+        if dx:
+            steps = offsetx / dx if offsety == 0 else 0
+        else:
+            steps = offsety / dy if offsetx == 0 else 0
+        return steps >= 1 and steps == int(steps) and steps <= self.rayLengths[pacDirection][row * self.height + col]
 
     def __str__(self):
         return "\n".join(self.layoutText)
@@ -128,22 +174,143 @@ class Layout:
         elif layoutChar in  ['1', '2', '3', '4']:
             self.agentPositions.append( (int(layoutChar), (x,y)))
             self.numGhosts += 1
+
 def getLayout(name, back = 2):
-    if name.endswith('.lay'):
-        layout = tryToLoad('layouts/' + name)
-        if layout == None: layout = tryToLoad(name)
+    """
+    Loads the layout called name from the layouts directory or the current
+    directory, or failing that from up to back + 1 directories above them.
+    """
+    if name.endswith('.lay') or name.endswith('.layc'):
+        candidates = ['layouts/' + name, name]
     else:
-        layout = tryToLoad('layouts/' + name + '.lay')
-        if layout == None: layout = tryToLoad(name + '.lay')
-    if layout == None and back >= 0:
-        curdir = os.path.abspath('.')
-        os.chdir('..')
-        layout = getLayout(name, back -1)
-        os.chdir(curdir)
-    return layout
+        candidates = ['layouts/' + name + '.lay', name + '.lay']
+    for level in range(back + 2):
+        for candidate in candidates:
+            layout = tryToLoad(os.path.join(*(['..'] * level + [candidate])))
+            if layout != None: return layout
+    return None
 
 def tryToLoad(fullname):
+    """
+    Returns the layout in the file fullname, or None if there is no such file.
+
+    Layouts are parsed once per process and then served from LAYOUT_CACHE
+    until the file changes.  When a compiled copy (fullname + 'c', see
+    compileLayout) at least as new as a .lay file exists, it is read instead.
+    """
     if(not os.path.exists(fullname)): return None
+    path = os.path.realpath(fullname)
+    modified = os.path.getmtime(path)
+    if path in LAYOUT_CACHE and LAYOUT_CACHE[path][0] == modified:
+        return LAYOUT_CACHE[path][1]
+
+    compiled = path + 'c'
+    if path.endswith('.layc'):
+        layout = loadCompiledLayout(path)
+    elif os.path.exists(compiled) and os.path.getmtime(compiled) >= modified:
+        layout = loadCompiledLayout(compiled)
+    else:
+        f = open(fullname)
+        try: layout = Layout([line.strip() for line in f])
+        finally: f.close()
+    LAYOUT_CACHE[path] = (modified, layout)
+    return layout
+
+# Compiled layouts
+#
+# A .layc file holds, in little endian order: the magic string 'LAYC', the
+# width and height, the layout text, the walls and food as bitsets of
+# ceil(height / 8) bytes per column (bit y % 8 of byte y / 8 is cell (x, y)),
+# the capsules and the agent positions as lists of coordinates, and the
+# number of ghosts.
+
+COMPILED_LAYOUT_MAGIC = 'LAYC'
+
+# The cells of a bitset byte as booleans, in order of increasing y
+BYTE_CELLS = [tuple([bool(byte >> bit & 1) for bit in range(8)]) for byte in range(256)]
+
+def packGrid(grid):
+    columns = []
+    for column in grid.data:
+        bits = bytearray((grid.height + 7) // 8)
+        for y, cell in enumerate(column):
+            if cell: bits[y // 8] |= 1 << y % 8
+        columns.append(str(bits))
+    return ''.join(columns)
+
+def unpackGrid(data, width, height):
+    grid = Grid(width, height, False)
+    columnBytes = (height + 7) // 8
+    for x in range(width):
+        column = []
+        for byte in bytearray(data[x * columnBytes:(x + 1) * columnBytes]):
+            column.extend(BYTE_CELLS[byte])
+        grid.data[x] = column[:height]
+    return grid
+
+def compileLayout(fullname, outname=None):
+    """
+    Writes the layout in the file fullname in the compiled format, to
+    outname or by default next to it as fullname + 'c', where tryToLoad will
+    find it.
+    """
     f = open(fullname)
-    try: return Layout([line.strip() for line in f])
+    try: layout = Layout([line.strip() for line in f])
     finally: f.close()
+    if outname == None: outname = fullname + 'c'
+
+    text = '\n'.join(layout.layoutText)
+    parts = [COMPILED_LAYOUT_MAGIC, struct.pack('<HHI', layout.width, layout.height, len(text)), text,
+             packGrid(layout.walls), packGrid(layout.food), struct.pack('<H', len(layout.capsules))]
+    parts += [struct.pack('<HH', x, y) for x, y in layout.capsules]
+    parts.append(struct.pack('<H', len(layout.agentPositions)))
+    parts += [struct.pack('<BHH', isPacman, x, y) for isPacman, (x, y) in layout.agentPositions]
+    parts.append(struct.pack('<H', layout.numGhosts))
+
+    f = open(outname, 'wb')
+    try: f.write(''.join(parts))
+    finally: f.close()
+
+def loadCompiledLayout(fullname):
+    """Reads a layout written by compileLayout."""
+    f = open(fullname, 'rb')
+    try: data = f.read()
+    finally: f.close()
+    if not data.startswith(COMPILED_LAYOUT_MAGIC):
+        raise Exception('%s is not a compiled layout' % fullname)
+
+    offset = len(COMPILED_LAYOUT_MAGIC)
+    width, height, textLength = struct.unpack_from('<HHI', data, offset)
+    offset += struct.calcsize('<HHI')
+    layoutText = data[offset:offset + textLength].split('\n')
+    offset += textLength
+
+    gridBytes = width * ((height + 7) // 8)
+    walls = unpackGrid(data[offset:offset + gridBytes], width, height)
+    offset += gridBytes
+    food = unpackGrid(data[offset:offset + gridBytes], width, height)
+    offset += gridBytes
+
+    numCapsules, = struct.unpack_from('<H', data, offset)
+    offset += 2
+    capsules = [struct.unpack_from('<HH', data, offset + 4 * i) for i in range(numCapsules)]
+    offset += 4 * numCapsules
+    numAgents, = struct.unpack_from('<H', data, offset)
+    offset += 2
+    agentPositions = []
+    for i in range(numAgents):
+        isPacman, x, y = struct.unpack_from('<BHH', data, offset)
+        agentPositions.append((bool(isPacman), (x, y)))
+        offset += struct.calcsize('<BHH')
+    numGhosts, = struct.unpack_from('<H', data, offset)
+
+    return Layout(layoutText, (walls, food, capsules, agentPositions, numGhosts))
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) < 2:
+        print 'Usage: python layout.py LAYOUT.lay ...  (writes LAYOUT.layc next to each)'
+        sys.exit(1)
+    for fullname in sys.argv[1:]:
+        compileLayout(fullname)
+        print 'Compiled %s to %sc' % (fullname, fullname)
@@ -0,0 +1,153 @@
+# parallelSearch.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Solves many independent search problems at once, one worker process per
+problem, with at most one worker per core running at a time.
+
+  results = parallelSearch.solveAll([lambda p=p: EightPuzzleSearchProblem(p) for p in puzzles],
+                                    search.aStarSearch, timeout=10, heuristic=patternDatabaseHeuristic)
+
+Each problem is built inside its worker by calling its constructor, so the
+constructors and the search function are never pickled on platforms that
+fork (lambdas are fine there); elsewhere they have to be module level
+functions.
+
+startWorker, receiveResult and stopWorker are the process handling shared
+with benchmark.py.
+"""
+
+import multiprocessing
+import time
+
+import search
+
+# Seconds to wait between checks on the running workers
+POLL_INTERVAL = 0.005
+
+
+def runTask(problemFactory, searchFunction, searchKwargs, connection):
+    """
+    Builds and solves one problem in a worker process and sends back a dict
+    with the status, the actions found and the SearchStats of the search.
+    """
+    try:
+        problem = problemFactory()
+        stats = search.SearchStats()
+        actions = stats.run(searchFunction, problem, **searchKwargs)
+        result = {'status': 'ok', 'actions': actions, 'stats': stats.asDict()}
+    except Exception, e:
+        result = {'status': 'error: %s' % e, 'actions': None, 'stats': None}
+    connection.send(result)
+    connection.close()
+
+
+def startWorker(target, args):
+    """
+    Starts a process running target(*args, connection), where connection is
+    the sending end of a pipe, and returns the process and the receiving end.
+    """
+    parentEnd, childEnd = multiprocessing.Pipe(False)
+    worker = multiprocessing.Process(target=target, args=tuple(args) + (childEnd,))
+    worker.start()
+    # Close our copy of the child's end so a worker that dies without
+    # answering shows up as end of file
+    childEnd.close()
+    return worker, parentEnd
+
+
+def receiveResult(worker, connection):
+    """
+    Returns what the worker sent on connection, or None if it exited without
+    sending anything; its exit code is then in worker.exitcode.
+    """
+    try:
+        return connection.recv()
+    except EOFError:
+        worker.join()
+        return None
+
+
+def stopWorker(worker, connection):
+    """Stops the worker, if still running, and closes its connection."""
+    worker.terminate()
+    worker.join()
+    connection.close()
+
+
+def solveAll(problemFactories, searchFunction, processes=None, timeout=None, **searchKwargs):
+    """
+    problemFactories: a list of functions of no arguments, each returning a
+      SearchProblem
+    searchFunction: the search function from search.py to run on each problem
+    processes: the most workers to run at once [Default: the number of cores]
+    timeout: seconds after which a worker is stopped [Default: no limit]
+    searchKwargs: passed on to searchFunction, e.g. heuristic=...
+
+    Returns, in the order of problemFactories, a dict for every problem with
+    'status' ('ok', 'timeout' or 'error: ...'), 'actions' and 'stats' (the
+    SearchStats of the search as a dict; None unless the status is 'ok').
+    """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    results = [None] * len(problemFactories)
+    pending = list(enumerate(problemFactories))
+    pending.reverse()
+    running = {}   # index of the problem -> (worker, connection, deadline)
+
+    while pending or running:
+        while pending and len(running) < processes:
+            index, problemFactory = pending.pop()
+            worker, connection = startWorker(runTask, (problemFactory, searchFunction, searchKwargs))
+            deadline = None if timeout is None else time.time() + timeout
+            running[index] = (worker, connection, deadline)
+
+        finished = []
+        for index, (worker, connection, deadline) in running.items():
+            if connection.poll():
+                results[index] = receiveResult(worker, connection)
+                if results[index] is None:
+                    results[index] = {'status': 'error: worker exited with code %s' % worker.exitcode,
+                                      'actions': None, 'stats': None}
+            elif deadline is not None and time.time() > deadline:
+                results[index] = {'status': 'timeout', 'actions': None, 'stats': None}
+            else:
+                continue
+            stopWorker(worker, connection)
+            finished.append(index)
+        for index in finished:
+            del running[index]
+        if running and not finished:
+            time.sleep(POLL_INTERVAL)
+    return results
+
+
+if __name__ == '__main__':
+    import random
+    import eightpuzzle
+
+    random.seed(0)
+    puzzles = [eightpuzzle.createRandomEightPuzzle(100) for i in range(16)]
+    factories = [lambda puzzle=puzzle: eightpuzzle.EightPuzzleSearchProblem(puzzle) for puzzle in puzzles]
+
+    start = time.time()
+    results = solveAll(factories, search.breadthFirstSearch, timeout=60)
+    print('Solved %d random eight puzzles with BFS on %d cores in %.2f seconds' %
+          (len(puzzles), multiprocessing.cpu_count(), time.time() - start))
+    for i, result in enumerate(results):
+        if result['status'] == 'ok':
+            print('Puzzle %2d: %2d moves, %6d nodes expanded' %
+                  (i, len(result['actions']), result['stats']['nodesExpanded']))
+        else:
+            print('Puzzle %2d: %s' % (i, result['status']))
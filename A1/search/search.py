@@ -18,6 +18,9 @@ Pacman agents (in searchAgents.py).
 """
 
 import util
+from array import array
+import json
+import time
 
 
 # noinspection PyClassHasNoInit
@@ -27,6 +30,22 @@ class SearchProblem:
     any of the methods (in object-oriented terminology: an abstract class).
 
     You do not need to change anything in this class, ever.
+
+    Problems may also provide optional methods that some searches use:
+
+      packState(state), unpackState(code):
+          convert between states and non-negative ints; when present, the
+          searches keep their closed set as ints (see PackedStateTable)
+      getNumPackedStates():
+          an upper bound on packState codes, for dense closed sets
+      getGoalState(), getPredecessors(state):
+          the single goal and the reverse successor function, for
+          bidirectionalSearch
+      generateSuccessors(state):
+          a generator yielding the triples of getSuccessors one at a time,
+          in the same order; when present, the searches use it instead of
+          getSuccessors (see successorFunction), so successors that are
+          never looked at are never built
     """
 
     def getStartState(self):
@@ -64,11 +83,314 @@ class SearchProblem:
         util.raiseNotDefined()
 
 
+def successorFunction(problem):
+    """
+    Returns the successor function the searches should call: the lazy
+    generateSuccessors when the problem has one, getSuccessors otherwise.
+    """
+    if hasattr(problem, "generateSuccessors"):
+        return problem.generateSuccessors
+    return problem.getSuccessors
+
+
+class SearchNodeStore:
+    """
+    An array-backed store of search nodes shared by the graph searches below.
+
+    A node is identified by its index in the store and is described by its
+    state, the index of its parent node (-1 for the root), the action taken
+    from the parent, the path cost g of reaching it and, for informed
+    searches, its cached heuristic value h.  Each push therefore costs O(1)
+    instead of copying the whole path; the list of actions is only rebuilt,
+    by following parent indices, once a goal has been found.
+
+    When the problem can pack its states (packState and unpackState), only
+    the packed codes are kept and getState unpacks them again on expansion,
+    so no state object is held per generated node.
+    """
+
+    def __init__(self, problem=None):
+        self.states = []
+        self.parents = []
+        self.actions = []
+        self.costs = []
+        self.heuristics = []
+        if hasattr(problem, 'packState') and hasattr(problem, 'unpackState'):
+            self.pack, self.unpack = problem.packState, problem.unpackState
+        else:
+            self.pack = self.unpack = None
+
+    def add(self, state, parent=-1, action=None, cost=0, heuristic=0):
+        """
+        Stores a new node and returns its index.
+        """
+        self.states.append(state if self.pack is None else self.pack(state))
+        self.parents.append(parent)
+        self.actions.append(action)
+        self.costs.append(cost)
+        self.heuristics.append(heuristic)
+        return len(self.states) - 1
+
+    def getState(self, node):
+        """
+        Returns the state of node.
+        """
+        if self.unpack is None:
+            return self.states[node]
+        return self.unpack(self.states[node])
+
+    def isOnPath(self, node, state):
+        """
+        Returns True if state is the state of node or of any of its ancestors.
+        """
+        if self.pack is not None:
+            state = self.pack(state)
+        while node != -1:
+            if self.states[node] == state:
+                return True
+            node = self.parents[node]
+        return False
+
+    def getActions(self, node):
+        """
+        Returns the sequence of actions leading from the root to node.
+        """
+        actions = []
+        while self.parents[node] != -1:
+            actions.append(self.actions[node])
+            node = self.parents[node]
+        actions.reverse()
+        return actions
+
+
+class PackedStateTable:
+    """
+    Maps states to numbers, like the Seen dicts of the graph searches below,
+    but keyed by the ints returned by problem.packState instead of by the
+    states themselves, which for tuple states costs a fraction of the memory.
+
+    If the problem also reports getNumPackedStates(), the table is a flat
+    array indexed by code instead of a dict: of doubles for path costs, the
+    default, or of ints for node indices (typecode 'l'), so each entry takes
+    8 bytes.  Only the values stored in the table are kept, never the states.
+    """
+
+    def __init__(self, problem, typecode='d'):
+        self.pack = problem.packState
+        self.size = 0
+        self.UNSEEN = float('inf') if typecode == 'd' else -1
+        if hasattr(problem, 'getNumPackedStates'):
+            self.values = array(typecode, [self.UNSEEN]) * problem.getNumPackedStates()
+        else:
+            self.values = {}
+
+    def __contains__(self, state):
+        code = self.pack(state)
+        if isinstance(self.values, dict):
+            return code in self.values
+        return self.values[code] != self.UNSEEN
+
+    def __getitem__(self, state):
+        return self.values[self.pack(state)]
+
+    def __setitem__(self, state, value):
+        code = self.pack(state)
+        if isinstance(self.values, dict):
+            if code not in self.values:
+                self.size += 1
+        elif self.values[code] == self.UNSEEN:
+            self.size += 1
+        self.values[code] = value
+
+    def __len__(self):
+        return self.size
+
+    def getByCode(self, code):
+        """
+        Returns the value stored for the state that packs to code.
+        """
+        return self.values[code]
+
+
+def newSeenTable(problem, typecode='d'):
+    """
+    Returns an empty table from states to path costs (or, with typecode 'l',
+    to node indices) for the closed set of a graph search: a PackedStateTable
+    if the problem can pack its states, a plain dict otherwise.
+    """
+    if hasattr(problem, 'packState'):
+        return PackedStateTable(problem, typecode)
+    return {}
+
+
+class SearchStats:
+    """
+    Collects measurements of a search.  Pass an instance as the stats
+    argument of any search function below; the search then wraps its
+    successor function, heuristic, open list and closed set so that they
+    record into it, and leaves them untouched when stats is None.
+
+    The measurements are plain attributes, also available as a dict from
+    asDict() or as JSON from dump():
+
+      nodesExpanded, nodesGenerated:  calls to getSuccessors, and the
+                                      successors they returned (for lazy
+                                      problems, the ones actually taken)
+      stalePops:                      open list entries skipped because a
+                                      cheaper path to their state was found
+      peakOpen, peakClosed:           largest open list and closed set sizes
+      heuristicCalls, heuristicTime:  calls to the heuristic and their time
+      successorTime, queueTime:       time spent generating successors and in
+                                      open list operations
+      totalTime:                      wall time of the search, set by run()
+    """
+
+    def __init__(self):
+        self.nodesExpanded = 0
+        self.nodesGenerated = 0
+        self.stalePops = 0
+        self.peakOpen = 0
+        self.peakClosed = 0
+        self.heuristicCalls = 0
+        self.heuristicTime = 0.0
+        self.successorTime = 0.0
+        self.queueTime = 0.0
+        self.totalTime = 0.0
+
+    def run(self, searchFunction, problem, *args, **kwargs):
+        """
+        Runs searchFunction on problem, recording into this collector, and
+        returns its result.
+        """
+        start = time.time()
+        try:
+            return searchFunction(problem, *args, stats=self, **kwargs)
+        finally:
+            self.totalTime += time.time() - start
+
+    def watchSuccessors(self, getSuccessors):
+        """Returns getSuccessors, counting and timing its calls."""
+        def watchedGetSuccessors(*args):
+            start = time.time()
+            successors = getSuccessors(*args)
+            self.successorTime += time.time() - start
+            self.nodesExpanded += 1
+            if hasattr(successors, '__len__'):
+                self.nodesGenerated += len(successors)
+                return successors
+            return self.watchGenerator(successors)
+        return watchedGetSuccessors
+
+    def watchGenerator(self, successors):
+        """Yields from successors, counting and timing each one taken."""
+        successors = iter(successors)
+        while True:
+            start = time.time()
+            try:
+                Succ = next(successors)
+            except StopIteration:
+                self.successorTime += time.time() - start
+                return
+            self.successorTime += time.time() - start
+            self.nodesGenerated += 1
+            yield Succ
+
+    def watchHeuristic(self, heuristic):
+        """Returns heuristic, counting and timing its calls."""
+        def watchedHeuristic(state, problem=None):
+            start = time.time()
+            value = heuristic(state, problem)
+            self.heuristicTime += time.time() - start
+            self.heuristicCalls += 1
+            return value
+        return watchedHeuristic
+
+    def watchOpen(self, queue):
+        """Returns a view of a util open list that times it and tracks its size."""
+        return WatchedQueue(queue, self)
+
+    def watchClosed(self, table):
+        """Returns a view of a closed set (any dict-like table) that tracks its size."""
+        return WatchedTable(table, self)
+
+    def asDict(self):
+        return dict((name, getattr(self, name)) for name in
+                    ['nodesExpanded', 'nodesGenerated', 'stalePops', 'peakOpen', 'peakClosed',
+                     'heuristicCalls', 'heuristicTime', 'successorTime', 'queueTime', 'totalTime'])
+
+    def dump(self, fileName):
+        """Writes the measurements to fileName as a JSON object."""
+        with open(fileName, 'w') as f:
+            json.dump(self.asDict(), f, indent=2, sort_keys=True)
+
+
+class WatchedQueue:
+    """
+    Wraps a util Stack, Queue or priority queue for SearchStats: timing the
+    operations and recording the largest size the queue reaches.
+    """
+
+    def __init__(self, queue, stats):
+        self.queue = queue
+        self.stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self.queue, name)
+
+    def __len__(self):
+        return len(self.queue.heap if hasattr(self.queue, 'heap') else self.queue.list)
+
+    def push(self, *args):
+        start = time.time()
+        self.queue.push(*args)
+        self.stats.queueTime += time.time() - start
+        self.stats.peakOpen = max(self.stats.peakOpen, len(self))
+
+    def update(self, *args):
+        start = time.time()
+        self.queue.update(*args)
+        self.stats.queueTime += time.time() - start
+        self.stats.peakOpen = max(self.stats.peakOpen, len(self))
+
+    def pop(self):
+        start = time.time()
+        item = self.queue.pop()
+        self.stats.queueTime += time.time() - start
+        return item
+
+
+class WatchedTable:
+    """
+    Wraps a closed set for SearchStats, recording the largest size it reaches.
+    """
+
+    def __init__(self, table, stats):
+        self.table = table
+        self.stats = stats
+
+    def __contains__(self, state):
+        return state in self.table
+
+    def __getitem__(self, state):
+        return self.table[state]
+
+    def __setitem__(self, state, value):
+        self.table[state] = value
+        self.stats.peakClosed = max(self.stats.peakClosed, len(self.table))
+
+    def __delitem__(self, state):
+        del self.table[state]
+
+    def __len__(self):
+        return len(self.table)
+
+
 # noinspection PyUnusedLocal
-def tinyMazeSearch(problem):
+def tinyMazeSearch(problem, stats=None):
     """
     Returns a sequence of moves that solves tinyMaze.  For any other maze, the
     sequence of moves will be incorrect, so only use this for tinyMaze.
+    stats is accepted like in the other searches, but nothing is expanded.
     """
     from game import Directions
     s = Directions.SOUTH
@@ -76,7 +398,7 @@ def tinyMazeSearch(problem):
     return [s, s, w, s, w, w, s, w]
 
 
-def depthFirstSearch(problem):
+def depthFirstSearch(problem, stats=None):
     """
     Search the deepest nodes in the search tree first.
 
@@ -89,83 +411,113 @@ def depthFirstSearch(problem):
     print "Start:", problem.getStartState()
     print "Is the start a goal?", problem.isGoalState(problem.getStartState())
     print "Start's successors:", problem.getSuccessors(problem.getStartState())
+
+    Pass a SearchStats as stats to record measurements of the search.
     """
+    Nodes = SearchNodeStore(problem)
     Open = util.Stack()
-    Open.push(([problem.getStartState()], []))
-    # Open contains tuples (array of states + sequence of actions from start state)
+    Expand = successorFunction(problem)
+    if stats is not None:
+        Open, Expand = stats.watchOpen(Open), stats.watchSuccessors(Expand)
+
+    Open.push(Nodes.add(problem.getStartState()))
+    # Open contains indices of nodes in Nodes
 
     while not Open.isEmpty():
         ThisNode = Open.pop()
-
-        StatesInThisNode = ThisNode[0]
-        ActionsSoFar = ThisNode[1]
-        ThisState = StatesInThisNode[-1]
+        ThisState = Nodes.getState(ThisNode)
 
         if problem.isGoalState(ThisState):
-            return ActionsSoFar
-        for Succ in problem.getSuccessors(ThisState):
-            if not Succ[0] in StatesInThisNode:
-                Open.push((StatesInThisNode + [Succ[0]], ActionsSoFar + [Succ[1]]))
+            return Nodes.getActions(ThisNode)
+        for Succ in Expand(ThisState):
+            if not Nodes.isOnPath(ThisNode, Succ[0]):
+                Open.push(Nodes.add(Succ[0], ThisNode, Succ[1], Nodes.costs[ThisNode] + Succ[2]))
 
     return []
 
 
-def breadthFirstSearch(problem):
-    """Search the shallowest nodes in the search tree first."""
+def breadthFirstSearch(problem, stats=None):
+    """
+    Search the shallowest nodes in the search tree first.
+
+    For problems with generateSuccessors (see SearchProblem) the goal test is
+    done as successors are generated, so the search stops at the first goal
+    generated instead of first generating the rest of its layer.
+    """
+    EarlyGoalTest = hasattr(problem, "generateSuccessors")
+    Nodes = SearchNodeStore(problem)
     Open = util.Queue()
-    Open.push(([problem.getStartState()], []))
+    Seen = newSeenTable(problem)
+    Expand = successorFunction(problem)
+    if stats is not None:
+        Open, Seen, Expand = stats.watchOpen(Open), stats.watchClosed(Seen), stats.watchSuccessors(Expand)
+
+    Open.push(Nodes.add(problem.getStartState()))
     # Same as depthFirstSearch
 
-    Seen = {problem.getStartState(): 0}
-    CostFn = problem.getCostOfActions
+    Seen[problem.getStartState()] = 0
 
     while not Open.isEmpty():
         ThisNode = Open.pop()
 
-        StatesInThisNode = ThisNode[0]
-        ActionsSoFar = ThisNode[1]
-        ThisState = StatesInThisNode[-1]
-        if CostFn(ActionsSoFar) <= Seen[ThisState]:
+        ThisState = Nodes.getState(ThisNode)
+        CostSoFar = Nodes.costs[ThisNode]
+        if CostSoFar <= Seen[ThisState]:
             if problem.isGoalState(ThisState):
-                return ActionsSoFar
-            for Succ in problem.getSuccessors(ThisState):
-                if Succ[0] not in Seen or CostFn(ActionsSoFar + [Succ[1]]) < Seen[Succ[0]]:
-                    Open.push((StatesInThisNode + [Succ[0]], ActionsSoFar + [Succ[1]]))
-                    Seen[Succ[0]] = CostFn(ActionsSoFar + [Succ[1]])
+                return Nodes.getActions(ThisNode)
+            for Succ in Expand(ThisState):
+                NewCost = CostSoFar + Succ[2]
+                if Succ[0] not in Seen or NewCost < Seen[Succ[0]]:
+                    NewNode = Nodes.add(Succ[0], ThisNode, Succ[1], NewCost)
+                    if EarlyGoalTest and problem.isGoalState(Succ[0]):
+                        return Nodes.getActions(NewNode)
+                    Open.push(NewNode)
+                    Seen[Succ[0]] = NewCost
+        elif stats is not None:
+            stats.stalePops += 1
 
     return []
 
 
-def uniformCostSearch(problem):
-    """Search the node of least total cost first."""
-    def CostFn(Node):
-        if hasattr(problem, "costFn"):
-            return sum(problem.costFn(State) for State in Node[0])
-        return problem.getCostOfActions(Node[1])
+def uniformCostSearch(problem, decreaseKey=False, stats=None):
+    """
+    Search the node of least total cost first.
+
+    With decreaseKey=True the open list is a util.IndexedPriorityQueue that
+    holds every state at most once (see decreaseKeySearch).
+    """
+    Nodes = SearchNodeStore(problem)
+    CostFn = lambda Node: Nodes.costs[Node]
+
+    if decreaseKey:
+        return decreaseKeySearch(problem, Nodes, CostFn, nullHeuristic, stats)
 
     Open = util.PriorityQueueWithFunction(CostFn)
+    Seen = newSeenTable(problem)
+    Expand = successorFunction(problem)
+    if stats is not None:
+        Open, Seen, Expand = stats.watchOpen(Open), stats.watchClosed(Seen), stats.watchSuccessors(Expand)
 
-    StartNode = ([problem.getStartState()], [])
+    StartNode = Nodes.add(problem.getStartState())
     Open.push(StartNode)
     # Same as depthFirstSearch
 
-    Seen = {StartNode[0][0]: CostFn(StartNode)}
+    Seen[problem.getStartState()] = CostFn(StartNode)
 
     while not Open.isEmpty():
         ThisNode = Open.pop()
-
-        StatesInThisNode = ThisNode[0]
-        ActionsSoFar = ThisNode[1]
-        ThisState = StatesInThisNode[-1]
+        ThisState = Nodes.getState(ThisNode)
 
         if CostFn(ThisNode) <= Seen[ThisState]:
             if problem.isGoalState(ThisState):
-                return ActionsSoFar
-            for Succ in problem.getSuccessors(ThisState):
-                NewNode = (StatesInThisNode + [Succ[0]], ActionsSoFar + [Succ[1]])
-                if Succ[0] not in Seen or CostFn(NewNode) < Seen[Succ[0]]:
-                    Open.push(NewNode)
-                    Seen[Succ[0]] = CostFn(NewNode)
+                return Nodes.getActions(ThisNode)
+            for Succ in Expand(ThisState):
+                NewCost = CostFn(ThisNode) + Succ[2]
+                if Succ[0] not in Seen or NewCost < Seen[Succ[0]]:
+                    Open.push(Nodes.add(Succ[0], ThisNode, Succ[1], NewCost))
+                    Seen[Succ[0]] = NewCost
+        elif stats is not None:
+            stats.stalePops += 1
     return []
 
 
@@ -178,41 +530,458 @@ def nullHeuristic(state, problem=None):
     return 0
 
 
-def aStarSearch(problem, heuristic=nullHeuristic):
-    """Search the node that has the lowest combined cost and heuristic first."""
-    g = problem.getCostOfActions
+def decreaseKeySearch(problem, Nodes, EvalFunc, heuristic, stats=None):
+    """
+    Best-first graph search over a util.IndexedPriorityQueue, shared by
+    uniformCostSearch and aStarSearch.
+
+    The open list is keyed by state: finding a cheaper path to a state that is
+    already queued decreases its key instead of pushing a duplicate entry, so
+    no stale entries are ever popped.  A cheaper path to an expanded state
+    puts it back in the open list, as the lazy versions do.
+
+    If the problem can pack its states, Best is a PackedStateTable and the
+    open list holds the packed codes instead of the states.
+
+      Nodes:     the SearchNodeStore to build the search tree in
+      EvalFunc:  node index -> priority in the open list
+    """
+    Open = util.IndexedPriorityQueue()
+    Best = newSeenTable(problem, 'l')
+    # Best maps each state to the index of the cheapest node reaching it, and
+    # NodeOf maps the keys of the open list, Key(state), back to those indices
+    if isinstance(Best, PackedStateTable):
+        Key, NodeOf = problem.packState, Best.getByCode
+    else:
+        Key, NodeOf = lambda state: state, Best.__getitem__
+    Expand = successorFunction(problem)
+    if stats is not None:
+        Open, Best, Expand = stats.watchOpen(Open), stats.watchClosed(Best), stats.watchSuccessors(Expand)
+        if heuristic is not nullHeuristic:
+            heuristic = stats.watchHeuristic(heuristic)
+
+    StartState = problem.getStartState()
+    Best[StartState] = Nodes.add(StartState, heuristic=heuristic(StartState, problem))
+    Open.push(Key(StartState), EvalFunc(Best[StartState]))
+
+    while not Open.isEmpty():
+        ThisNode = NodeOf(Open.pop())
+        ThisState = Nodes.getState(ThisNode)
+
+        if problem.isGoalState(ThisState):
+            return Nodes.getActions(ThisNode)
+        for Succ in Expand(ThisState):
+            NewCost = Nodes.costs[ThisNode] + Succ[2]
+            if Succ[0] not in Best:
+                NewNode = Nodes.add(Succ[0], ThisNode, Succ[1], NewCost, heuristic(Succ[0], problem))
+            elif NewCost < Nodes.costs[Best[Succ[0]]]:
+                NewNode = Nodes.add(Succ[0], ThisNode, Succ[1], NewCost, Nodes.heuristics[Best[Succ[0]]])
+            else:
+                continue
+            Best[Succ[0]] = NewNode
+            Open.update(Key(Succ[0]), EvalFunc(NewNode))
+    return []
+
+
+def aStarSearch(problem, heuristic=nullHeuristic, decreaseKey=False, weight=1, stats=None):
+    """
+    Search the node that has the lowest combined cost and heuristic first.
+
+    With decreaseKey=True the open list is a util.IndexedPriorityQueue that
+    holds every state at most once (see decreaseKeySearch).
+
+    A weight other than 1 orders the open list by g + weight * h instead (see
+    weightedAStarSearch).
+    """
+    Nodes = SearchNodeStore(problem)
+    g = lambda Node: Nodes.costs[Node]
     h = heuristic
 
-    EvalFunc = lambda Node: (g(Node[1]) + h(Node[0][-1], problem), g(Node[1]))
+    # f = g + h is computed from the values cached on the node, so the
+    # heuristic is evaluated exactly once per generated node
+    if weight == 1:
+        EvalFunc = lambda Node: (g(Node) + Nodes.heuristics[Node], g(Node))
+    else:
+        EvalFunc = lambda Node: (g(Node) + weight * Nodes.heuristics[Node], g(Node))
 
-    Open = util.PriorityQueueWithFunction(EvalFunc)
+    if decreaseKey:
+        return decreaseKeySearch(problem, Nodes, EvalFunc, h, stats)
 
-    StartNode = ([problem.getStartState()], [])
-    Open.push(StartNode)
+    Open = util.PriorityQueueWithFunction(EvalFunc)
+    # Seen maps each state to the lowest path cost found so far; for a given
+    # state h is fixed, so comparing g is the same as comparing f
+    Seen = newSeenTable(problem)
+    Expand = successorFunction(problem)
+    if stats is not None:
+        Open, Seen, Expand = stats.watchOpen(Open), stats.watchClosed(Seen), stats.watchSuccessors(Expand)
+        h = stats.watchHeuristic(h)
+
+    StartState = problem.getStartState()
+    Open.push(Nodes.add(StartState, heuristic=h(StartState, problem)))
     # Same as depthFirstSearch
 
-    Seen = {StartNode[0][0]: EvalFunc(StartNode)}
+    Seen[StartState] = 0
 
     while not Open.isEmpty():
         ThisNode = Open.pop()
+        ThisState = Nodes.getState(ThisNode)
 
-        StatesInThisNode = ThisNode[0]
-        ActionsSoFar = ThisNode[1]
-        ThisState = StatesInThisNode[-1]
-
-        if EvalFunc(ThisNode) <= Seen[ThisState]:
+        if g(ThisNode) <= Seen[ThisState]:
             if problem.isGoalState(ThisState):
-                return ActionsSoFar
-            for Succ in problem.getSuccessors(ThisState):
-                NewNode = (StatesInThisNode + [Succ[0]], ActionsSoFar + [Succ[1]])
-                if Succ[0] not in Seen or EvalFunc(NewNode) < Seen[Succ[0]]:
-                    Open.push(NewNode)
-                    Seen[Succ[0]] = EvalFunc(NewNode)
+                return Nodes.getActions(ThisNode)
+            for Succ in Expand(ThisState):
+                NewCost = g(ThisNode) + Succ[2]
+                if Succ[0] not in Seen or NewCost < Seen[Succ[0]]:
+                    Open.push(Nodes.add(Succ[0], ThisNode, Succ[1], NewCost, h(Succ[0], problem)))
+                    Seen[Succ[0]] = NewCost
+        elif stats is not None:
+            stats.stalePops += 1
     return []
 
 
+def weightedAStarSearch(problem, heuristic=nullHeuristic, weight=2, stats=None):
+    """
+    A* ordered by f = g + weight * h.  Trusting the heuristic more makes the
+    search head for the goal with far fewer expansions; when the heuristic is
+    admissible the path found costs at most weight times the optimum.
+    """
+    return aStarSearch(problem, heuristic, weight=weight, stats=stats)
+
+
+def focalSearch(problem, heuristic=nullHeuristic, epsilon=0.5, stats=None):
+    """
+    A*-epsilon: finds a path costing at most (1 + epsilon) times the optimum
+    when the heuristic is admissible.
+
+    The open list is ordered by f = g + h as in A*, but the node expanded is
+    not the one with the lowest f: it is, among the nodes whose f is within
+    (1 + epsilon) of the lowest f (the focal list), the one with the lowest h,
+    i.e. the one that looks closest to the goal.  The lowest f never exceeds
+    the optimal cost, which gives the bound.
+
+    Three heaps share the nodes: Open by f, to track the lowest f; Waiting by
+    f, for the nodes not yet in the focal list; and Focal by h.  Entries for
+    nodes that were expanded or reached more cheaply are dropped when they
+    come up, and a focal node whose f is no longer within the bound goes
+    back to Waiting.
+    """
+    Nodes = SearchNodeStore(problem)
+    g = lambda Node: Nodes.costs[Node]
+    f = lambda Node: g(Node) + Nodes.heuristics[Node]
+    h = heuristic
+
+    Open, Waiting, Focal = util.PriorityQueue(), util.PriorityQueue(), util.PriorityQueue()
+    Seen = newSeenTable(problem)
+    Closed = set()
+    # Closed holds the indices of the nodes already expanded
+    Expand = successorFunction(problem)
+    if stats is not None:
+        Open, Seen, Expand = stats.watchOpen(Open), stats.watchClosed(Seen), stats.watchSuccessors(Expand)
+        h = stats.watchHeuristic(h)
+
+    def isLive(Node):
+        return Node not in Closed and g(Node) <= Seen[Nodes.getState(Node)]
+
+    def push(Node):
+        Open.push(Node, (f(Node), g(Node)))
+        Waiting.push(Node, f(Node))
+
+    StartState = problem.getStartState()
+    push(Nodes.add(StartState, heuristic=h(StartState, problem)))
+    Seen[StartState] = 0
+
+    while True:
+        while not Open.isEmpty() and not isLive(Open.heap[0][2]):
+            Open.pop()
+        if Open.isEmpty():
+            return []
+        Bound = (1 + epsilon) * Open.heap[0][0][0]
+
+        while not Waiting.isEmpty() and Waiting.heap[0][0] <= Bound:
+            Node = Waiting.pop()
+            if isLive(Node):
+                Focal.push(Node, (Nodes.heuristics[Node], f(Node)))
+
+        # The live node with the lowest f is within the bound, so the focal
+        # list holds at least one live node
+        while True:
+            ThisNode = Focal.pop()
+            if not isLive(ThisNode):
+                if stats is not None:
+                    stats.stalePops += 1
+            elif f(ThisNode) > Bound:
+                Waiting.push(ThisNode, f(ThisNode))
+            else:
+                break
+
+        ThisState = Nodes.getState(ThisNode)
+        Closed.add(ThisNode)
+        if problem.isGoalState(ThisState):
+            return Nodes.getActions(ThisNode)
+        for Succ in Expand(ThisState):
+            NewCost = g(ThisNode) + Succ[2]
+            if Succ[0] not in Seen or NewCost < Seen[Succ[0]]:
+                push(Nodes.add(Succ[0], ThisNode, Succ[1], NewCost, h(Succ[0], problem)))
+                Seen[Succ[0]] = NewCost
+
+
+def idaStarSearch(problem, heuristic=nullHeuristic, tableSize=100000, stats=None):
+    """
+    Iterative-deepening A*: a sequence of depth first searches that prune every
+    node whose f = g + h exceeds a bound, starting with the bound h(start) and
+    raising it to the smallest pruned f after each search, until a goal is
+    found.  Paths are optimal when the heuristic is admissible.
+
+    Memory grows with the depth of the solution rather than with the number
+    of states: each search only keeps the current path, plus a transposition
+    table of the cheapest g with which each state was reached during that
+    search.  The table lets us skip states already explored with more budget,
+    which keeps mazes from being searched once per path, and stops growing
+    after tableSize states (0 disables it).
+
+    There is no open list, so with stats the peakOpen measurement stays 0;
+    peakClosed is the largest transposition table of any of the searches.
+    """
+    Expand = successorFunction(problem)
+    if stats is not None:
+        Expand, heuristic = stats.watchSuccessors(Expand), stats.watchHeuristic(heuristic)
+
+    StartState = problem.getStartState()
+    Bound = heuristic(StartState, problem)
+
+    while True:
+        NextBound = None
+        Table = {} if stats is None else stats.watchClosed({})
+        # Path holds one [state, action, g, successors left to try] per depth;
+        # successors are only generated once the state passes the bound
+        Path = [[StartState, None, 0, None]]
+        OnPath = {StartState: True}
+
+        while Path:
+            Frame = Path[-1]
+            ThisState, CostSoFar = Frame[0], Frame[2]
+            if Frame[3] is None:
+                f = CostSoFar + heuristic(ThisState, problem)
+                if f > Bound:
+                    if NextBound is None or f < NextBound:
+                        NextBound = f
+                    del OnPath[ThisState]
+                    Path.pop()
+                    continue
+                if problem.isGoalState(ThisState):
+                    return [Step[1] for Step in Path[1:]]
+                Frame[3] = iter(Expand(ThisState))
+                # An iterator, so lazy problems only build the successors
+                # that get tried
+
+            for Succ in Frame[3]:
+                NewCost = CostSoFar + Succ[2]
+                if Succ[0] in OnPath or (Succ[0] in Table and Table[Succ[0]] <= NewCost):
+                    continue
+                if Succ[0] in Table or len(Table) < tableSize:
+                    Table[Succ[0]] = NewCost
+                OnPath[Succ[0]] = True
+                Path.append([Succ[0], Succ[1], NewCost, None])
+                break
+            else:
+                del OnPath[ThisState]
+                Path.pop()
+
+        if NextBound is None:
+            return []
+        Bound = NextBound
+
+
+def jumpPointSearch(problem, heuristic=nullHeuristic, stats=None):
+    """
+    Jump Point Search: A* for problems on a 4-connected grid with unit step
+    costs and a single goal, such as a PositionSearchProblem with the default
+    costFn.  Runs of cells where every shortest path just keeps going are
+    jumped over instead of being expanded one at a time.
+
+    Among equally short paths it only follows the canonical ones, which turn
+    from a vertical into a horizontal move anywhere but from a horizontal into
+    a vertical move only where the previous cell of the row could not have
+    turned instead.  So a horizontal jump stops at the goal or at such a
+    forced turn, and a vertical jump stops at the goal or at a cell from which
+    a horizontal jump finds a jump point.  Every shortest path can be rewritten
+    into a canonical one, so the returned path is still optimal.
+
+    The problem must provide walls (a game.Grid), getGoalState() and a true
+    unitCosts attribute; any other problem is rejected with an Exception.
+    """
+    from game import Directions
+    if not getattr(problem, 'unitCosts', False):
+        raise Exception('jumpPointSearch needs a grid problem with unit step costs, '
+                        'such as a PositionSearchProblem with the default costFn')
+    if not hasattr(problem, 'getGoalState'):
+        raise Exception('jumpPointSearch needs a problem with a single goal state (getGoalState)')
+    walls = problem.walls
+    GoalState = problem.getGoalState()
+    Vectors = {Directions.NORTH: (0, 1), Directions.SOUTH: (0, -1),
+               Directions.EAST: (1, 0), Directions.WEST: (-1, 0)}
+
+    def isOpen(x, y):
+        return 0 <= x < walls.width and 0 <= y < walls.height and not walls[x][y]
+
+    def jumpHorizontally(x, y, dx):
+        """Returns the first jump point reached by moving along the row, or None."""
+        while True:
+            x += dx
+            if not isOpen(x, y):
+                return None
+            if (x, y) == GoalState:
+                return x, y
+            for dy in (1, -1):
+                if isOpen(x, y + dy) and not isOpen(x - dx, y + dy):
+                    return x, y
+
+    def jumpVertically(x, y, dy):
+        """Returns the first jump point reached by moving along the column, or None."""
+        while True:
+            y += dy
+            if not isOpen(x, y):
+                return None
+            if (x, y) == GoalState or jumpHorizontally(x, y, 1) or jumpHorizontally(x, y, -1):
+                return x, y
+
+    def canonicalDirections(state, arrival):
+        """Returns the directions in which canonical paths leave state."""
+        if arrival is None:
+            return [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+        if arrival in (Directions.NORTH, Directions.SOUTH):
+            return [arrival, Directions.EAST, Directions.WEST]
+        (x, y), dx = state, Vectors[arrival][0]
+        return [arrival] + [direction for direction in (Directions.NORTH, Directions.SOUTH)
+                            if isOpen(x, y + Vectors[direction][1])
+                            and not isOpen(x - dx, y + Vectors[direction][1])]
+
+    def jumpPoints(state, arrival):
+        """
+        Returns (jumpPoint, (direction, steps), steps) triples, like
+        getSuccessors, for the jump points reached from state.
+        """
+        x, y = state
+        successors = []
+        for direction in canonicalDirections(state, arrival):
+            dx, dy = Vectors[direction]
+            jumpPoint = jumpHorizontally(x, y, dx) if dx else jumpVertically(x, y, dy)
+            if jumpPoint is not None:
+                steps = abs(jumpPoint[0] - x) + abs(jumpPoint[1] - y)
+                successors.append((jumpPoint, (direction, steps), steps))
+        return successors
+
+    # Nodes are jump points; their action is a (direction, number of steps)
+    # pair.  States are told apart by the direction they were entered from,
+    # since that decides which ways the search continues from them.
+    Nodes = SearchNodeStore(problem)
+    Open = util.PriorityQueue()
+    Seen = {}
+    Expand = jumpPoints
+    if stats is not None:
+        Open, Seen, Expand = stats.watchOpen(Open), stats.watchClosed(Seen), stats.watchSuccessors(Expand)
+        heuristic = stats.watchHeuristic(heuristic)
+
+    StartState = problem.getStartState()
+    StartNode = Nodes.add(StartState, heuristic=heuristic(StartState, problem))
+    Open.push(StartNode, (Nodes.heuristics[StartNode], 0))
+    Seen[(StartState, None)] = 0
+
+    while not Open.isEmpty():
+        ThisNode = Open.pop()
+        ThisState, CostSoFar = Nodes.getState(ThisNode), Nodes.costs[ThisNode]
+        Arrival = Nodes.actions[ThisNode] and Nodes.actions[ThisNode][0]
+
+        if CostSoFar > Seen[(ThisState, Arrival)]:
+            if stats is not None:
+                stats.stalePops += 1
+            continue
+        if problem.isGoalState(ThisState):
+            return [Direction for Direction, Steps in Nodes.getActions(ThisNode) for _ in range(Steps)]
+
+        if hasattr(problem, '_expanded'):
+            problem._expanded += 1
+        for JumpPoint, Action, Steps in Expand(ThisState, Arrival):
+            NewCost = CostSoFar + Steps
+            if (JumpPoint, Action[0]) not in Seen or NewCost < Seen[(JumpPoint, Action[0])]:
+                Seen[(JumpPoint, Action[0])] = NewCost
+                NewNode = Nodes.add(JumpPoint, ThisNode, Action, NewCost, heuristic(JumpPoint, problem))
+                Open.push(NewNode, (NewCost + Nodes.heuristics[NewNode], NewCost))
+    return []
+
+
+def bidirectionalSearch(problem, stats=None):
+    """
+    Search from the start and from the goal at the same time, expanding the
+    cheaper of the two frontiers each time, until the searches meet on a path
+    that neither frontier can improve on.  With unit step costs both searches
+    advance in BFS layers, so each only has to reach about half the depth of a
+    forward search.
+
+    The problem must have a single goal state and moves that can be followed
+    backwards, and provide two methods on top of the SearchProblem ones:
+
+      getGoalState():           returns the goal state
+      getPredecessors(state):   like getSuccessors, but returns triples
+                                (predecessor, action, stepCost) where action
+                                leads from predecessor to state
+    """
+    StartState, GoalState = problem.getStartState(), problem.getGoalState()
+    if problem.isGoalState(StartState):
+        return []
+
+    # One (Nodes, Best, Open, expand) tuple per direction, where Best maps a
+    # state to the index of the cheapest node reaching it in that direction
+    Searches = []
+    for Root, Expand in ((StartState, successorFunction(problem)), (GoalState, problem.getPredecessors)):
+        Nodes = SearchNodeStore(problem)
+        Best = {}
+        Open = util.IndexedPriorityQueue()
+        if stats is not None:
+            Open, Best, Expand = stats.watchOpen(Open), stats.watchClosed(Best), stats.watchSuccessors(Expand)
+        Best[Root] = Nodes.add(Root)
+        Open.push(Root, 0)
+        Searches.append((Nodes, Best, Open, Expand))
+    Forward, Backward = Searches
+
+    BestCost, Meeting = None, None
+    while not Forward[2].isEmpty() and not Backward[2].isEmpty():
+        ForwardMin = Forward[2].getPriority(Forward[2].peek())
+        BackwardMin = Backward[2].getPriority(Backward[2].peek())
+        if BestCost is not None and ForwardMin + BackwardMin >= BestCost:
+            break
+
+        ThisSearch, OtherSearch = (Forward, Backward) if ForwardMin <= BackwardMin else (Backward, Forward)
+        Nodes, Best, Open, Expand = ThisSearch
+        OtherNodes, OtherBest = OtherSearch[:2]
+
+        ThisState = Open.pop()
+        ThisNode = Best[ThisState]
+        for Succ in Expand(ThisState):
+            NewCost = Nodes.costs[ThisNode] + Succ[2]
+            if Succ[0] not in Best or NewCost < Nodes.costs[Best[Succ[0]]]:
+                Best[Succ[0]] = Nodes.add(Succ[0], ThisNode, Succ[1], NewCost)
+                Open.update(Succ[0], NewCost)
+                if Succ[0] in OtherBest:
+                    PathCost = NewCost + OtherNodes.costs[OtherBest[Succ[0]]]
+                    if BestCost is None or PathCost < BestCost:
+                        BestCost, Meeting = PathCost, Succ[0]
+
+    if Meeting is None:
+        return []
+    # Backward nodes point towards the goal, so their actions are already in
+    # the order in which they have to be taken
+    return (Forward[0].getActions(Forward[1][Meeting]) +
+            Backward[0].getActions(Backward[1][Meeting])[::-1])
+
+
 # Abbreviations
 bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
+wastar = weightedAStarSearch
+focal = focalSearch
 ucs = uniformCostSearch
+idastar = idaStarSearch
+jps = jumpPointSearch
+bds = bidirectionalSearch
@@ -37,6 +37,10 @@ Good luck and happy searching!
 from game import Directions
 from game import Agent
 from game import Actions
+from array import array
+import collections
+import hashlib
+import heapq
 import time
 import search
 
@@ -70,19 +74,43 @@ class SearchAgent(Agent):
     Options for fn include:
       depthFirstSearch or dfs
       breadthFirstSearch or bfs
+      bidirectionalSearch or bds (PositionSearchProblem only)
+      weightedAStarSearch or wastar (with weight, e.g. -a fn=wastar,weight=1.5)
+      focalSearch or focal (with epsilon, e.g. -a fn=focal,epsilon=0.2)
 
 
+    If stats is the name of a file, the search is measured with a
+    search.SearchStats and the measurements are written to it as JSON.
+
+    weight and epsilon are passed on to search functions that take them, to
+    trade a bounded amount of path cost for speed.
+
     Note: You should NOT change any code in SearchAgent
     """
 
-    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic'):
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', stats=None,
+                 weight=None, epsilon=None):
         # Warning: some advanced Python magic is employed below to find the right functions and problems
 
         # Get the search function from the name and heuristic
         if fn not in dir(search):
             raise fn + ' is not a search function in search.py.', AttributeError
         func = getattr(search, fn)
-        if 'heuristic' not in func.func_code.co_varnames:
+        takesHeuristic = 'heuristic' in func.func_code.co_varnames
+
+        # Bind the bounded suboptimality parameters the function takes
+        searchArgs = {}
+        for name, value in [('weight', weight), ('epsilon', epsilon)]:
+            if value is not None:
+                if name not in func.func_code.co_varnames:
+                    raise AttributeError('%s does not take a %s.' % (fn, name))
+                searchArgs[name] = float(value)
+        if searchArgs:
+            print('[SearchAgent] using %s' % ', '.join(['%s=%s' % item for item in sorted(searchArgs.items())]))
+            unboundFunc = func
+            func = lambda x, **kwargs: unboundFunc(x, **dict(searchArgs, **kwargs))
+
+        if not takesHeuristic:
             print('[SearchAgent] using function ' + fn)
             self.searchFunction = func
         else:
@@ -94,7 +122,7 @@ class SearchAgent(Agent):
                 raise heuristic + ' is not a function in searchAgents.py or search.py.', AttributeError
             print('[SearchAgent] using function %s and heuristic %s' % (fn, heuristic))
             # Note: this bit of Python trickery combines the search algorithm and the heuristic
-            self.searchFunction = lambda x: func(x, heuristic=heur)
+            self.searchFunction = lambda x, **kwargs: func(x, heuristic=heur, **kwargs)
 
         # Get the search problem type from the name
         if prob not in globals().keys() or not prob.endswith('Problem'):
@@ -102,6 +130,7 @@ class SearchAgent(Agent):
         self.searchType = globals()[prob]
         print('[SearchAgent] using problem type ' + prob)
 
+        self.statsFile = stats
         self.actions = []
         self.actionIndex = 0
 
@@ -118,7 +147,12 @@ class SearchAgent(Agent):
             raise Exception("No search function provided for SearchAgent"), Exception
         starttime = time.time()
         problem = self.searchType(state)  # Makes a new search problem
-        self.actions = self.searchFunction(problem)  # Find a path
+        if getattr(self, 'statsFile', None):
+            searchStats = search.SearchStats()
+            self.actions = searchStats.run(self.searchFunction, problem)  # Find a path
+            searchStats.dump(self.statsFile)
+        else:
+            self.actions = self.searchFunction(problem)  # Find a path
         totalCost = problem.getCostOfActions(self.actions)
         print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
         if '_expanded' in dir(problem):
@@ -142,6 +176,11 @@ class SearchAgent(Agent):
             return Directions.STOP
 
 
+def unitCost(position):
+    """The default costFn of a PositionSearchProblem: every step costs 1."""
+    return 1
+
+
 # noinspection PyProtectedMember
 class PositionSearchProblem(search.SearchProblem):
     """
@@ -154,7 +193,11 @@ class PositionSearchProblem(search.SearchProblem):
     Note: this search problem is fully specified; you should NOT change it.
     """
 
-    def __init__(self, gameState, costFn=lambda x: 1, goal=(1, 1), start=None, warn=True, visualize=True):
+    # The ExpansionDisplay recording expanded cells, or None when no display
+    # can draw them
+    observer = None
+
+    def __init__(self, gameState, costFn=unitCost, goal=(1, 1), start=None, warn=True, visualize=True):
         """
         Stores the start and goal.
 
@@ -168,12 +211,17 @@ class PositionSearchProblem(search.SearchProblem):
             self.startState = start
         self.goal = goal
         self.costFn = costFn
+        # Whether every step costs 1, as search.jumpPointSearch requires
+        self.unitCosts = costFn is unitCost
         self.visualize = visualize
+        self.adjacency = getAdjacency(self.walls)
         if warn and (gameState.getNumFood() != 1 or not gameState.hasFood(*goal)):
             print 'Warning: this does not look like a regular search maze'
 
         # For display purposes
         self._visited, self._visitedlist, self._expanded = {}, [], 0  # DO NOT CHANGE
+        if visualize:
+            self.observer = ExpansionDisplay.find(self._visited, self._visitedlist)
 
     def getStartState(self):
         return self.startState
@@ -182,12 +230,8 @@ class PositionSearchProblem(search.SearchProblem):
         isGoal = state == self.goal
 
         # For display purposes only
-        if isGoal and self.visualize:
-            self._visitedlist.append(state)
-            import __main__
-            if '_display' in dir(__main__):
-                if 'drawExpandedCells' in dir(__main__._display):  # @UndefinedVariable
-                    __main__._display.drawExpandedCells(self._visitedlist)  # @UndefinedVariable
+        if isGoal and self.observer is not None:
+            self.observer.goalFound(state)
 
         return isGoal
 
@@ -203,24 +247,50 @@ class PositionSearchProblem(search.SearchProblem):
          cost of expanding to that successor
         """
 
-        successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x, y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
-                successors.append((nextState, action, cost))
+        x, y = state
+        successors = [(nextState, action, self.costFn(nextState))
+                      for nextState, action in self.adjacency[x * self.walls.height + y]]
 
         # Bookkeeping for display purposes
         self._expanded += 1  # DO NOT CHANGE
-        if state not in self._visited:
-            self._visited[state] = True
-            self._visitedlist.append(state)
+        if self.observer is not None:
+            self.observer.expanded(state)
 
         return successors
 
+    def getGoalState(self):
+        """Returns the single goal position, for search.bidirectionalSearch."""
+        return self.goal
+
+    def getPredecessors(self, state):
+        """
+        Returns the positions from which state can be reached, the actions
+        leading from them to state, and the cost of stepping into state.
+        Moves on the grid are reversible, so these are the neighbours of state,
+        each with the reverse of the move that leads to it.
+        """
+        x, y = state
+        cost = self.costFn(state)
+        predecessors = [(prevState, Directions.REVERSE[action], cost)
+                        for prevState, action in self.adjacency[x * self.walls.height + y]]
+
+        # Bookkeeping for display purposes
+        self._expanded += 1
+        if self.observer is not None:
+            self.observer.expanded(state)
+
+        return predecessors
+
+    def packState(self, state):
+        """Returns the cell index x * height + y of a position."""
+        return state[0] * self.walls.height + state[1]
+
+    def unpackState(self, code):
+        return code // self.walls.height, code % self.walls.height
+
+    def getNumPackedStates(self):
+        return self.walls.width * self.walls.height
+
     def getCostOfActions(self, actions):
         """
         Returns the cost of a particular sequence of actions. If those actions
@@ -240,6 +310,43 @@ class PositionSearchProblem(search.SearchProblem):
         return cost
 
 
+class ExpansionDisplay:
+    """
+    Records the cells a PositionSearchProblem expands, in order, and draws
+    them on the display once the goal is found.
+
+    Problems only get one when a display that can draw expanded cells is
+    running, so headless runs (-q, the autograder, mazeDistance) skip the
+    bookkeeping altogether.
+    """
+
+    def __init__(self, display, visited, visitedList):
+        self.display = display
+        self.visited = visited
+        self.visitedList = visitedList
+
+    def find(visited, visitedList):
+        """
+        Returns an ExpansionDisplay recording into visited and visitedList if
+        the running display has drawExpandedCells, or None.
+        """
+        import __main__
+        display = getattr(__main__, '_display', None)
+        if display is None or not hasattr(display, 'drawExpandedCells'):
+            return None
+        return ExpansionDisplay(display, visited, visitedList)
+    find = staticmethod(find)
+
+    def expanded(self, state):
+        if state not in self.visited:
+            self.visited[state] = True
+            self.visitedList.append(state)
+
+    def goalFound(self, state):
+        self.visitedList.append(state)
+        self.display.drawExpandedCells(self.visitedList)
+
+
 # noinspection PyMissingConstructor
 class StayEastSearchAgent(SearchAgent):
     """
@@ -319,6 +426,13 @@ class CornersProblem(search.SearchProblem):
         "*** YOUR CODE HERE ***"
         #                                       (1, 1) (1, top) (right, 1) (right, top)
         self.startState = self.startingPosition, False, False, False, False
+        self.adjacency = getAdjacency(self.walls)
+        self.wallCounts = SummedAreaTable(self.walls)
+
+        # Maze distances from each corner to every cell, indexed like
+        # adjacency, and the cheapest way to tour the unexplored corners
+        self.cornerDistances = [self.distancesFrom(corner) for corner in self.corners]
+        self.cornerTours = self.shortestCornerTours()
 
     def getStartState(self):
         """
@@ -346,30 +460,86 @@ class CornersProblem(search.SearchProblem):
             is the incremental cost of expanding to that successor
         """
         successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+        x, y = state[0]
+        for (nextx, nexty), action in self.adjacency[x * self.walls.height + y]:
             # Add a successor state to the successor list if the action is legal
             "*** YOUR CODE HERE ***"
-            x, y = state[0]
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
             bottomLeft, topLeft, bottomRight, topRight = state[1:]
-            if not self.walls[nextx][nexty]:
-                if nextx == 1:
-                    if nexty == 1:
-                        bottomLeft = True
-                    elif nexty == self.walls.height - 2:
-                        topLeft = True
-                elif nextx == self.walls.width - 2:
-                    if nexty == 1:
-                        bottomRight = True
-                    elif nexty == self.walls.height - 2:
-                        topRight = True
-                nextState = (nextx, nexty), bottomLeft, topLeft, bottomRight, topRight
-                successors.append((nextState, action, 1))
+            if nextx == 1:
+                if nexty == 1:
+                    bottomLeft = True
+                elif nexty == self.walls.height - 2:
+                    topLeft = True
+            elif nextx == self.walls.width - 2:
+                if nexty == 1:
+                    bottomRight = True
+                elif nexty == self.walls.height - 2:
+                    topRight = True
+            nextState = (nextx, nexty), bottomLeft, topLeft, bottomRight, topRight
+            successors.append((nextState, action, 1))
 
         self._expanded += 1  # DO NOT CHANGE
         return successors
 
+    def distancesFrom(self, source):
+        """
+        Returns the maze distance from source to every cell, as an array
+        indexed by x * height + y, by breadth first search.  Walls and cells
+        that cannot be reached hold MazeDistances.UNREACHABLE.
+        """
+        height = self.walls.height
+        distances = array('H', [MazeDistances.UNREACHABLE]) * len(self.adjacency)
+        x, y = source
+        if self.walls[x][y]:
+            return distances
+        distances[x * height + y] = 0
+        frontier = [source]
+        depth = 0
+        while frontier:
+            depth += 1
+            nextFrontier = []
+            for x, y in frontier:
+                for (nextx, nexty), action in self.adjacency[x * height + y]:
+                    if distances[nextx * height + nexty] == MazeDistances.UNREACHABLE:
+                        distances[nextx * height + nexty] = depth
+                        nextFrontier.append((nextx, nexty))
+            frontier = nextFrontier
+        return distances
+
+    def shortestCornerTours(self):
+        """
+        Returns tours such that tours[mask][i] is the length of the shortest
+        walk that starts at corner i and visits every corner whose bit is set
+        in mask (bit i included), over the maze distances between corners.
+        """
+        height = self.walls.height
+        between = [[distances[x * height + y] for x, y in self.corners] for distances in self.cornerDistances]
+        tours = [[0] * 4 for mask in range(16)]
+        # Each mask only refers to smaller masks, so increasing order works
+        for mask in range(1, 16):
+            for i in range(4):
+                if mask & 1 << i and mask != 1 << i:
+                    rest = mask & ~(1 << i)
+                    tours[mask][i] = min([between[i][j] + tours[rest][j] for j in range(4) if rest & 1 << j])
+        return tours
+
+    def packState(self, state):
+        """
+        Returns the cell index of the position followed by one bit per corner,
+        i.e. (x * height + y) * 16 + sum of 2^i for every explored corner i.
+        """
+        (x, y), bottomLeft, topLeft, bottomRight, topRight = state
+        return ((x * self.walls.height + y) << 4 |
+                bottomLeft << 3 | topLeft << 2 | bottomRight << 1 | topRight)
+
+    def unpackState(self, code):
+        cell = code >> 4
+        return ((cell // self.walls.height, cell % self.walls.height),
+                bool(code & 8), bool(code & 4), bool(code & 2), bool(code & 1))
+
+    def getNumPackedStates(self):
+        return self.walls.width * self.walls.height << 4
+
     def getCostOfActions(self, actions):
         """
         Returns the cost of a particular sequence of actions.  If those actions
@@ -386,7 +556,26 @@ class CornersProblem(search.SearchProblem):
         return len(actions)
 
 
-def WallsInGrid(walls, x1, x2, y1, y2):
+class SummedAreaTable:
+    """
+    Prefix sums over a Grid of booleans: table[x][y] is the number of True
+    cells in the columns before x and the rows before y, so the True cells of
+    any rectangle are counted with four lookups.
+    """
+
+    def __init__(self, grid):
+        self.table = table = [[0] * (grid.height + 1) for x in range(grid.width + 1)]
+        for x in range(grid.width):
+            for y in range(grid.height):
+                table[x + 1][y + 1] = grid[x][y] + table[x][y + 1] + table[x + 1][y] - table[x][y]
+
+    def count(self, x1, y1, x2, y2):
+        """Returns the number of True cells with x1 <= x < x2 and y1 <= y < y2."""
+        table = self.table
+        return table[x2][y2] - table[x1][y2] - table[x2][y1] + table[x1][y1]
+
+
+def WallsInGrid(walls, x1, x2, y1, y2, wallCounts=None):
     """
     Return the number of walls in the rectangle
      (x1, y2) --------------------------- (x2, y2)
@@ -394,8 +583,15 @@ def WallsInGrid(walls, x1, x2, y1, y2):
         |                                    |
         |                                    |
      (x1, y1) --------------------------- (x2, y1)
+
+    wallCounts is a SummedAreaTable of walls, such as CornersProblem.wallCounts;
+    passing it makes the count O(1).  Without it the walls are summed directly,
+    since building a table costs more than one count.
     """
-    return sum([walls[i][j] for i in range(abs(x1 - x2)) for j in range(abs(y1 - y2))])
+    # The rectangle is counted with its corner at the origin, as it always was
+    if wallCounts is None:
+        return sum([walls[i][j] for i in range(abs(x1 - x2)) for j in range(abs(y1 - y2))])
+    return wallCounts.count(0, 0, abs(x1 - x2), abs(y1 - y2))
 
 
 def cornersHeuristic(state, problem):
@@ -424,18 +620,43 @@ def cornersHeuristic(state, problem):
     DistancesToUnexpl = [(abs(x1 - corners[i][0]) + abs(y1 - corners[i][1]), corners[i])
                          for i in range(4) if not state[i + 1]]
 
-    WeightedDistances = [Pair[0] + 0.5 ** WallsInGrid(walls, x1, Pair[1][0], y1, Pair[1][1])
+    WeightedDistances = [Pair[0] + 0.5 ** WallsInGrid(walls, x1, Pair[1][0], y1, Pair[1][1], problem.wallCounts)
                          for Pair in DistancesToUnexpl]
 
     return max(WeightedDistances) + (min(WeightedDistances) if len(WeightedDistances) > 1 else 0)
 
 
+def cornersTSPHeuristic(state, problem):
+    """
+    The length of the shortest walk from Pacman through every unexplored
+    corner, over true maze distances.  It tries each unexplored corner as the
+    first one to reach and finishes with the shortest tour of the rest, both
+    precomputed by the CornersProblem, so each call is at most four lookups.
+
+    The heuristic is admissible and consistent.  It is exact everywhere but
+    on an unexplored corner, which only happens when Pacman starts on one:
+    that corner counts as reached at distance 0, while the CornersProblem
+    only marks it after Pacman steps off and back on, so the heuristic is 2
+    lower than the true cost there.
+    """
+    unexplored = 0
+    for i in range(4):
+        if not state[i + 1]:
+            unexplored |= 1 << i
+    if not unexplored:
+        return 0
+    x, y = state[0]
+    cell = x * problem.walls.height + y
+    tours = problem.cornerTours[unexplored]
+    return min([problem.cornerDistances[i][cell] + tours[i] for i in range(4) if unexplored & 1 << i])
+
+
 # noinspection PyMissingConstructor
 class AStarCornersAgent(SearchAgent):
-    """A SearchAgent for FoodSearchProblem using A* and your foodHeuristic"""
+    """A SearchAgent for CornersProblem using A* and cornersTSPHeuristic"""
 
     def __init__(self):
-        self.searchFunction = lambda prob: search.aStarSearch(prob, cornersHeuristic)
+        self.searchFunction = lambda prob: search.aStarSearch(prob, cornersTSPHeuristic)
         self.searchType = CornersProblem
 
 
@@ -466,7 +687,13 @@ class FoodSearchProblem:
 
     def getSuccessors(self, state):
         """Returns successor states, the actions they require, and a cost of 1."""
-        successors = []
+        return list(self.generateSuccessors(state))
+
+    def generateSuccessors(self, state):
+        """
+        Yields the successors of getSuccessors one at a time, so the food grid
+        of a successor is only copied once the search asks for it.
+        """
         self._expanded += 1  # DO NOT CHANGE
         for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
             x, y = state[0]
@@ -475,8 +702,7 @@ class FoodSearchProblem:
             if not self.walls[nextx][nexty]:
                 nextFood = state[1].copy()
                 nextFood[nextx][nexty] = False
-                successors.append((((nextx, nexty), nextFood), direction, 1))
-        return successors
+                yield (((nextx, nexty), nextFood), direction, 1)
 
     def getCostOfActions(self, actions):
         """Returns the cost of a particular sequence of actions.  If those actions
@@ -492,14 +718,61 @@ class FoodSearchProblem:
             cost += 1
         return cost
 
+    @staticmethod
+    def getFoodList(state):
+        """Returns the positions of the food remaining in state."""
+        return state[1].asList()
+
+
+# noinspection PyPep8Naming
+class BitmaskFoodSearchProblem(FoodSearchProblem):
+    """
+    A FoodSearchProblem whose states store the remaining food as a single int.
+
+    A search state in this problem is a tuple ( pacmanPosition, foodBits ) where
+      pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
+      foodBits:       an int whose bit i is set while food remains on foodCells[i]
+
+    Only the cells holding food at the start get a bit, since food is never
+    added.  Eating a dot is a single bit clear, the goal test is foodBits == 0
+    and states hash as plain ints and tuples, without walking a Grid.
+    """
+
+    def __init__(self, startingGameState):
+        FoodSearchProblem.__init__(self, startingGameState)
+        position, foodGrid = self.start
+        self.foodCells = foodGrid.asList()
+        self.foodBits = [1 << i for i in range(len(self.foodCells))]
+        self.foodBitAt = dict(zip(self.foodCells, self.foodBits))
+        self.start = (position, (1 << len(self.foodCells)) - 1)
+
+    @staticmethod
+    def isGoalState(state):
+        return state[1] == 0
+
+    def generateSuccessors(self, state):
+        """Yields the successors of getSuccessors one at a time."""
+        self._expanded += 1  # DO NOT CHANGE
+        (x, y), food = state
+        for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+            dx, dy = Actions.directionToVector(direction)
+            nextx, nexty = int(x + dx), int(y + dy)
+            if not self.walls[nextx][nexty]:
+                yield (((nextx, nexty), food & ~self.foodBitAt.get((nextx, nexty), 0)), direction, 1)
+
+    def getFoodList(self, state):
+        """Returns the positions of the food remaining in state."""
+        food = state[1]
+        return [cell for cell, bit in zip(self.foodCells, self.foodBits) if food & bit]
+
 
 # noinspection PyMissingConstructor
 class AStarFoodSearchAgent(SearchAgent):
-    """A SearchAgent for FoodSearchProblem using A* and your foodHeuristic"""
+    """A SearchAgent for FoodSearchProblem using A* and foodMSTHeuristic"""
 
     def __init__(self):
-        self.searchFunction = lambda prob: search.aStarSearch(prob, foodHeuristic)
-        self.searchType = FoodSearchProblem
+        self.searchFunction = lambda prob: search.aStarSearch(prob, foodMSTHeuristic)
+        self.searchType = BitmaskFoodSearchProblem
 
 
 def foodHeuristic(state, problem):
@@ -514,7 +787,8 @@ def foodHeuristic(state, problem):
 
     The state is a tuple ( pacmanPosition, foodGrid ) where foodGrid is a Grid
     (see game.py) of either True or False. You can call foodGrid.asList() to get
-    a list of food coordinates instead.
+    a list of food coordinates instead.  For a BitmaskFoodSearchProblem the food
+    is an int instead; problem.getFoodList(state) works for both problems.
 
     If you want access to info like walls, capsules, etc., you can query the
     problem.  For example, problem.walls gives you a Grid of where the walls
@@ -533,7 +807,49 @@ def foodHeuristic(state, problem):
     if problem.isGoalState(state):
         return 0
 
-    return max([abs(position[0] - ThisFood[0]) + abs(position[1] - ThisFood[1]) for ThisFood in foodGrid.asList()])
+    if 'mazeDistances' not in problem.heuristicInfo:
+        problem.heuristicInfo['mazeDistances'] = getMazeDistances(problem.walls)
+    distance = problem.heuristicInfo['mazeDistances'].getDistance
+
+    return max([distance(position, ThisFood) for ThisFood in problem.getFoodList(state)])
+
+
+def foodMSTHeuristic(state, problem):
+    """
+    A stronger heuristic for the FoodSearchProblem: the maze distance from
+    Pacman to the closest food plus the weight of a minimum spanning tree over
+    the remaining food, using the precomputed maze distances.
+
+    Any path that eats all the food first reaches some dot and then connects
+    every dot, so it is at least this long; the heuristic is admissible and,
+    since the tree does not depend on Pacman's position, also consistent.
+
+    The tree weight only depends on the remaining food, so it is memoized in
+    problem.heuristicInfo['foodMST'] keyed by the food part of the state (the
+    int bitmask of a BitmaskFoodSearchProblem); repeated subsets are O(1).
+    """
+    position, food = state
+    if problem.isGoalState(state):
+        return 0
+
+    if 'mazeDistances' not in problem.heuristicInfo:
+        problem.heuristicInfo['mazeDistances'] = getMazeDistances(problem.walls)
+    distance = problem.heuristicInfo['mazeDistances'].getDistance
+    TreeWeights = problem.heuristicInfo.setdefault('foodMST', {})
+
+    FoodList = problem.getFoodList(state)
+    if food not in TreeWeights:
+        # Prim's algorithm on the complete graph over the remaining food
+        TreeWeight = 0
+        ClosestToTree = dict((ThisFood, distance(FoodList[0], ThisFood)) for ThisFood in FoodList[1:])
+        while ClosestToTree:
+            Nearest = min(ClosestToTree, key=ClosestToTree.get)
+            TreeWeight += ClosestToTree.pop(Nearest)
+            for ThisFood in ClosestToTree:
+                ClosestToTree[ThisFood] = min(ClosestToTree[ThisFood], distance(Nearest, ThisFood))
+        TreeWeights[food] = TreeWeight
+
+    return min([distance(position, ThisFood) for ThisFood in FoodList]) + TreeWeights[food]
 
 
 class ClosestDotSearchAgent(SearchAgent):
@@ -541,16 +857,17 @@ class ClosestDotSearchAgent(SearchAgent):
 
     def registerInitialState(self, state):
         self.actions = []
-        currentState = state
-        while currentState.getFood().count() > 0:
-            nextPathSegment = self.findPathToClosestDot(currentState)  # The missing piece
+        # One distance field serves every segment; eating a dot only repairs
+        # the part of it that was nearest to that dot
+        field = FoodDistanceField(state.getWalls(), state.getFood())
+        position = state.getPacmanPosition()
+        while field.food:
+            path = field.pathToNearest(position)
+            if path is None:
+                break
+            nextPathSegment, position = path
             self.actions += nextPathSegment
-            for action in nextPathSegment:
-                legal = currentState.getLegalActions()
-                if action not in legal:
-                    t = (str(action), str(currentState))
-                    raise 'findPathToClosestDot returned an illegal move: %s!\n%s' % t, Exception
-                currentState = currentState.generateSuccessor(0, action)
+            field.eat(position)
         self.actionIndex = 0
         print 'Path found with cost %d.' % len(self.actions)
 
@@ -564,10 +881,12 @@ class ClosestDotSearchAgent(SearchAgent):
         startPosition = gameState.getPacmanPosition()
         food = gameState.getFood()
         walls = gameState.getWalls()
-        problem = AnyFoodSearchProblem(gameState)
 
         "*** YOUR CODE HERE ***"
-        return search.uniformCostSearch(problem)
+        path = FoodDistanceField(walls, food).pathToNearest(startPosition)
+        if path is None:
+            return []
+        return path[0]
 
 
 # noinspection PyMissingConstructor
@@ -594,9 +913,14 @@ class AnyFoodSearchProblem(PositionSearchProblem):
         # Store info for the PositionSearchProblem (no need to change this)
         self.walls = gameState.getWalls()
         self.startState = gameState.getPacmanPosition()
-        self.costFn = lambda x: 1
+        self.costFn = unitCost
+        self.unitCosts = True
+        self.adjacency = getAdjacency(self.walls)
         self._visited, self._visitedlist, self._expanded = {}, [], 0  # DO NOT CHANGE
 
+    def getGoalState(self):
+        raise Exception('AnyFoodSearchProblem has no single goal state: every food dot is a goal')
+
     def isGoalState(self, state):
         """
         The state is Pacman's position. Fill this in with a goal test that will
@@ -608,6 +932,140 @@ class AnyFoodSearchProblem(PositionSearchProblem):
         return self.food[x][y]
 
 
+# noinspection PyMissingConstructor
+class ApproximateSearchAgent(SearchAgent):
+    """
+    Eats all the food along a short, but not necessarily shortest, path.
+
+    The food is visited in the order of a tour over the maze distances: a
+    nearest neighbour tour from Pacman's position, improved by 2-opt moves
+    (reversing a stretch of the tour) and Or-opt moves (moving one to three
+    consecutive dots elsewhere in the tour, either way round) until no move
+    helps or timeLimit seconds have passed.  The cost of the tour is printed
+    as it improves and kept in costHistory as (seconds, cost) pairs.
+
+      python pacman.py -l bigSearch -p ApproximateSearchAgent -a timeLimit=5
+    """
+
+    def __init__(self, timeLimit='2'):
+        self.timeLimit = float(timeLimit)
+        self.costHistory = []
+
+    def registerInitialState(self, state):
+        self.startTime = time.time()
+        walls = state.getWalls()
+        self.distances = getMazeDistances(walls)
+        cellIndex = self.distances.cellIndex
+        start = cellIndex[state.getPacmanPosition()]
+        food = [cellIndex[cell] for cell in state.getFood().asList()
+                if self.distance(start, cellIndex[cell]) != MazeDistances.UNREACHABLE]
+
+        path = self.nearestNeighbourPath(start, food)
+        self.report(path)
+        while time.time() - self.startTime < self.timeLimit:
+            if not (self.twoOpt(path) or self.orOpt(path)):
+                break
+            self.report(path)
+
+        self.actions = self.pathActions(path, walls)
+        self.actionIndex = 0
+        print('Path found with total cost of %d in %.1f seconds' % (len(self.actions), time.time() - self.startTime))
+
+    def distance(self, cell1, cell2):
+        return self.distances.table[cell1 * self.distances.numCells + cell2]
+
+    def pathCost(self, path):
+        return sum([self.distance(path[i], path[i + 1]) for i in range(len(path) - 1)])
+
+    def report(self, path):
+        elapsed, cost = time.time() - self.startTime, self.pathCost(path)
+        self.costHistory.append((elapsed, cost))
+        print('Tour cost %d after %.2f seconds' % (cost, elapsed))
+
+    def nearestNeighbourPath(self, start, food):
+        """Returns [start] followed by the food, each time the closest left."""
+        path = [start]
+        left = set(food)
+        while left:
+            here = path[-1]
+            closest = min(left, key=lambda cell: self.distance(here, cell))
+            path.append(closest)
+            left.remove(closest)
+        return path
+
+    def twoOpt(self, path):
+        """
+        Reverses path[i:j + 1] wherever that shortens the path, for as long as
+        time allows.  path[0] is Pacman and stays put; the path does not
+        return to it.  Returns whether the path changed.
+        """
+        d = self.distance
+        last = len(path) - 1
+        improved = False
+        for i in range(1, last):
+            if time.time() - self.startTime >= self.timeLimit:
+                break
+            for j in range(i + 1, last + 1):
+                delta = d(path[i - 1], path[j]) - d(path[i - 1], path[i])
+                if j < last:
+                    delta += d(path[i], path[j + 1]) - d(path[j], path[j + 1])
+                if delta < 0:
+                    path[i:j + 1] = path[i:j + 1][::-1]
+                    improved = True
+        return improved
+
+    def orOpt(self, path):
+        """
+        Moves a run of one to three dots to wherever, in either direction, it
+        shortens the path most.  Returns whether the path changed.
+        """
+        d = self.distance
+        improved = False
+        for length in (1, 2, 3):
+            i = 1
+            while i + length <= len(path):
+                if time.time() - self.startTime >= self.timeLimit:
+                    return improved
+                end = i + length - 1
+                segment = path[i:end + 1]
+                rest = path[:i] + path[end + 1:]
+                removed = d(path[i - 1], path[i])
+                if end + 1 < len(path):
+                    removed += d(path[end], path[end + 1]) - d(path[i - 1], path[end + 1])
+
+                best, bestAt, bestSegment = 0, None, None
+                for k in range(len(rest)):
+                    following = rest[k + 1] if k + 1 < len(rest) else None
+                    for candidate in (segment, segment[::-1]):
+                        added = d(rest[k], candidate[0])
+                        if following is not None:
+                            added += d(candidate[-1], following) - d(rest[k], following)
+                        if added - removed < best:
+                            best, bestAt, bestSegment = added - removed, k, candidate
+                if bestAt is not None:
+                    path[:] = rest[:bestAt + 1] + bestSegment + rest[bestAt + 1:]
+                    improved = True
+                i += 1
+        return improved
+
+    def pathActions(self, path, walls):
+        """Returns the moves along shortest paths between consecutive cells of path."""
+        adjacency = getAdjacency(walls)
+        cells, cellIndex = self.distances.cells, self.distances.cellIndex
+        actions = []
+        for i in range(len(path) - 1):
+            here, goal = path[i], path[i + 1]
+            while here != goal:
+                x, y = cells[here]
+                for nextPosition, action in adjacency[x * walls.height + y]:
+                    nextCell = cellIndex[nextPosition]
+                    if self.distance(nextCell, goal) == self.distance(here, goal) - 1:
+                        actions.append(action)
+                        here = nextCell
+                        break
+        return actions
+
+
 def mazeDistance(point1, point2, gameState):
     """
     Returns the maze distance between any two points, using the search functions
@@ -623,5 +1081,221 @@ def mazeDistance(point1, point2, gameState):
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
-    return len(search.bfs(prob))
+    return getMazeDistances(walls).getDistance(point1, point2)
+
+
+class MazeDistances:
+    """
+    All-pairs shortest path lengths between the open cells of a layout.
+
+    The open cells are numbered in the order of Grid.asList(False) and the
+    distances are kept in a single flat array of unsigned shorts, with the
+    distance from cell i to cell j stored at i * numCells + j.  The table is
+    filled by a breadth first search from every open cell, so building it
+    costs O(numCells^2) once, after which every lookup is O(1).
+    """
+
+    UNREACHABLE = 0xFFFF  # Distance stored between cells that are not connected
+
+    def __init__(self, walls):
+        self.cells = walls.asList(False)
+        self.cellIndex = dict((cell, i) for i, cell in enumerate(self.cells))
+        self.numCells = numCells = len(self.cells)
+
+        neighbours = []
+        for x, y in self.cells:
+            adjacent = [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+            neighbours.append([self.cellIndex[cell] for cell in adjacent if cell in self.cellIndex])
+
+        self.table = array('H', [self.UNREACHABLE]) * (numCells * numCells)
+        table = self.table
+        for source in range(numCells):
+            row = source * numCells
+            table[row + source] = 0
+            frontier = [source]
+            depth = 0
+            while frontier:
+                depth += 1
+                nextFrontier = []
+                for cell in frontier:
+                    for neighbour in neighbours[cell]:
+                        if table[row + neighbour] == self.UNREACHABLE:
+                            table[row + neighbour] = depth
+                            nextFrontier.append(neighbour)
+                frontier = nextFrontier
+
+    def getDistance(self, point1, point2):
+        """
+        Returns the maze distance between two open cells, or UNREACHABLE if
+        no path connects them.
+        """
+        return self.table[self.cellIndex[point1] * self.numCells + self.cellIndex[point2]]
+
+
+def wallsKey(walls):
+    """
+    Returns a hashable key identifying the layout with the given walls: the
+    digest of the layout, which Layout stores on its walls, or for any other
+    Grid a digest of the walls computed on the first call and memoised on the
+    Grid.  Either way later calls are a plain attribute read.  Walls are never
+    changed once a layout has been loaded.
+    """
+    try:
+        return walls.layoutKey
+    except AttributeError:
+        walls.layoutKey = hashlib.sha1(str(walls)).hexdigest()
+        return walls.layoutKey
+
+
+# Number of layouts the per layout tables below are kept for; the least
+# recently used one is dropped first, since a MazeDistances table is O(N^2)
+LAYOUT_TABLES_CACHE_SIZE = 4
+
+
+def getLayoutTable(cache, walls, build):
+    """
+    Returns the table of the layout with the given walls from cache, calling
+    build(walls) to make it on first use.
+    """
+    key = wallsKey(walls)
+    if key in cache:
+        table = cache.pop(key)
+    else:
+        table = build(walls)
+        if len(cache) >= LAYOUT_TABLES_CACHE_SIZE:
+            cache.popitem(last=False)
+    cache[key] = table
+    return table
+
+
+MAZE_DISTANCES_CACHE = collections.OrderedDict()
+
+
+def getMazeDistances(walls):
+    """
+    Returns the MazeDistances of the layout with the given walls.  Tables are
+    built on first use and cached for every later problem on the same walls.
+    """
+    return getLayoutTable(MAZE_DISTANCES_CACHE, walls, MazeDistances)
+
+
+def buildAdjacency(walls):
+    """
+    Returns the legal moves out of every cell of the layout with the given
+    walls, as a list indexed by the cell index x * walls.height + y.  Each
+    entry is a tuple of (nextPosition, action) pairs in the order NORTH,
+    SOUTH, EAST, WEST, and is empty for wall cells.
+    """
+    adjacency = []
+    for x in range(walls.width):
+        for y in range(walls.height):
+            moves = []
+            if not walls[x][y]:
+                for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+                    dx, dy = Actions.directionToVector(action)
+                    nextx, nexty = int(x + dx), int(y + dy)
+                    if 0 <= nextx < walls.width and 0 <= nexty < walls.height and not walls[nextx][nexty]:
+                        moves.append(((nextx, nexty), action))
+            adjacency.append(tuple(moves))
+    return adjacency
+
+
+ADJACENCY_CACHE = collections.OrderedDict()
+
+
+def getAdjacency(walls):
+    """
+    Returns the buildAdjacency table of the layout with the given walls.  The
+    table is built once per layout and shared by all the position based
+    problems on the same walls, so their successor functions only need a
+    list lookup per expansion.
+    """
+    return getLayoutTable(ADJACENCY_CACHE, walls, buildAdjacency)
+
+
+class FoodDistanceField:
+    """
+    The maze distance from every cell to the nearest remaining food, kept up
+    to date as food is eaten.
+
+    The field is built once by a breadth first search from all the food at
+    the same time.  Each cell also records the food it is nearest to, so
+    eating a dot only invalidates the cells that were nearest to that dot;
+    those are refilled from the valid cells around them, leaving the rest of
+    the field untouched.  A shortest path to the closest dot from any cell is
+    then read off by walking downhill.
+    """
+
+    UNREACHABLE = float('inf')
+
+    def __init__(self, walls, food):
+        self.height = walls.height
+        self.adjacency = getAdjacency(walls)
+        height = self.height
+        self.neighbours = [[x * height + y for (x, y), action in moves] for moves in self.adjacency]
+        self.distance = [self.UNREACHABLE] * len(self.adjacency)
+        self.nearest = [-1] * len(self.adjacency)
+        self.food = set(x * height + y for x, y in food.asList())
+        self.fill([(0, cell, cell) for cell in self.food])
+
+    def fill(self, seeds):
+        """
+        Dijkstra's algorithm from seeds, a list of (distance, cell, nearest
+        food) triples, lowering the distances that it can improve.
+        """
+        distance, nearest, neighbours = self.distance, self.nearest, self.neighbours
+        heapq.heapify(seeds)
+        for d, cell, source in seeds:
+            if d < distance[cell]:
+                distance[cell], nearest[cell] = d, source
+        while seeds:
+            d, cell, source = heapq.heappop(seeds)
+            if d > distance[cell] or nearest[cell] != source:
+                continue
+            for neighbour in neighbours[cell]:
+                if d + 1 < distance[neighbour]:
+                    distance[neighbour], nearest[neighbour] = d + 1, source
+                    heapq.heappush(seeds, (d + 1, neighbour, source))
+
+    def eat(self, position):
+        """Removes the food at position and repairs the field around it."""
+        x, y = position
+        eaten = x * self.height + y
+        self.food.discard(eaten)
+        distance, nearest, neighbours = self.distance, self.nearest, self.neighbours
+
+        # The cells nearest to the eaten dot form a connected region around it
+        invalid = [eaten]
+        nearest[eaten] = -1
+        for cell in invalid:
+            distance[cell] = self.UNREACHABLE
+            for neighbour in neighbours[cell]:
+                if nearest[neighbour] == eaten:
+                    nearest[neighbour] = -1
+                    invalid.append(neighbour)
+
+        seeds = []
+        for cell in invalid:
+            for neighbour in neighbours[cell]:
+                if nearest[neighbour] != -1:
+                    seeds.append((distance[neighbour] + 1, cell, nearest[neighbour]))
+        self.fill(seeds)
+
+    def pathToNearest(self, position):
+        """
+        Returns (actions, foodPosition) for a shortest path from position to
+        the closest food, or None if no food can be reached.
+        """
+        x, y = position
+        cell = x * self.height + y
+        if self.distance[cell] == self.UNREACHABLE:
+            return None
+        actions = []
+        while self.distance[cell] > 0:
+            for nextPosition, action in self.adjacency[cell]:
+                nextCell = nextPosition[0] * self.height + nextPosition[1]
+                if self.distance[nextCell] == self.distance[cell] - 1:
+                    actions.append(action)
+                    position, cell = nextPosition, nextCell
+                    break
+        return actions, position
@@ -206,6 +206,110 @@ class PriorityQueue:
         else:
             self.push(item, priority)
 
+class IndexedPriorityQueue:
+    """
+      Implements a priority queue that holds each item at most once.  Next
+      to the binary heap it keeps a map from every item to its position in
+      the heap, which gives O(1) membership tests and priority lookups and
+      lets update perform a true decrease-key in O(log n) instead of pushing
+      a duplicate entry.  Items must be hashable.
+
+      Like PriorityQueue, equal priorities are served in the order in which
+      the items were last pushed or updated, so it can be used as a drop-in
+      replacement for it.
+    """
+    def  __init__(self):
+        self.heap = []
+        self.index = {}
+        self.count = 0
+
+    def push(self, item, priority):
+        "Adds item with the given priority, or resets its priority if it is already queued"
+        if item in self.index:
+            position = self.index[item]
+            entry = self.heap[position]
+            entry[0], entry[1] = priority, self.count
+            self.count += 1
+            self._siftUp(position)
+            self._siftDown(self.index[item])
+            return
+        self.heap.append([priority, self.count, item])
+        self.index[item] = len(self.heap) - 1
+        self.count += 1
+        self._siftUp(len(self.heap) - 1)
+
+    def pop(self):
+        last = self.heap.pop()
+        if not self.heap:
+            del self.index[last[2]]
+            return last[2]
+        item = self.heap[0][2]
+        del self.index[item]
+        self.heap[0] = last
+        self.index[last[2]] = 0
+        self._siftDown(0)
+        return item
+
+    def peek(self):
+        "Returns the lowest-priority item without removing it"
+        return self.heap[0][2]
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def update(self, item, priority):
+        # If item already in priority queue with higher priority, decrease its key.
+        # If item already in priority queue with equal or lower priority, do nothing.
+        # If item not in priority queue, do the same thing as self.push.
+        if item not in self.index:
+            self.push(item, priority)
+        elif priority < self.heap[self.index[item]][0]:
+            self.push(item, priority)
+
+    def contains(self, item):
+        "Returns true if item is currently in the queue"
+        return item in self.index
+
+    __contains__ = contains
+
+    def getPriority(self, item):
+        "Returns the current priority of a queued item"
+        return self.heap[self.index[item]][0]
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _siftUp(self, position):
+        heap, index = self.heap, self.index
+        entry = heap[position]
+        while position > 0:
+            parent = (position - 1) >> 1
+            if heap[parent] <= entry:
+                break
+            heap[position] = heap[parent]
+            index[heap[position][2]] = position
+            position = parent
+        heap[position] = entry
+        index[entry[2]] = position
+
+    def _siftDown(self, position):
+        heap, index = self.heap, self.index
+        size = len(heap)
+        entry = heap[position]
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+            if entry <= heap[child]:
+                break
+            heap[position] = heap[child]
+            index[heap[position][2]] = position
+            position = child
+        heap[position] = entry
+        index[entry[2]] = position
+
 class PriorityQueueWithFunction(PriorityQueue):
     """
     Implements a priority queue with the same push/pop signature of the